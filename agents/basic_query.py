@@ -1,101 +1,45 @@
-import pandas as pd
-from datetime import datetime
-import json
-import ast
 import os
 from dotenv import load_dotenv
+from agents.symptom_logs import MOOD_PREFIX
+from agents.prompt_context import render_profile_details
+from agents.prompt_budget import PromptSection, assemble_prompt
 
-from langchain_ibm import WatsonxLLM
-from langchain.memory import ConversationBufferMemory
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
-
-# --- Data Loading: This happens only once when the module is imported ---
-try:
-    users_df = pd.read_csv('data/userData.csv').set_index('user_id')
-    symptom_logs_df = pd.read_csv('data/userLogData.csv').set_index('user_id')
-    print("BasicQueryAgent: Data files loaded successfully.")
-except FileNotFoundError as e:
-    print(f"BasicQueryAgent FATAL ERROR: {e}. The agent will not have access to user data.")
-    users_df = None
-    symptom_logs_df = None
 
 load_dotenv()
 
 # --- Helper Function to process log data ---
 def summarize_user_logs(log_data):
+    """Summarize parsed logs ({symptom: [iso dates]}, see agents/symptom_logs.py)."""
     if not log_data:
         return "No recent logs found for this user."
     summary_points = []
-    symptom_columns = ['Hot Flash', 'Bloating', 'Cramps', 'Anxiety', 'Back Pain', 'Fatigue']
-    for symptom in symptom_columns:
-        if symptom in log_data and pd.notna(log_data[symptom]):
-            try:
-                dates = ast.literal_eval(log_data[symptom])
-                if dates:
-                    summary_points.append(f"- Logged '{symptom}' {len(dates)} times recently.")
-            except (ValueError, SyntaxError): continue
-    if 'mood' in log_data and pd.notna(log_data['mood']):
-        try:
-            mood_data = json.loads(log_data['mood'])
-            if mood_data:
-                summary_points.append(f"- Logged moods including: {', '.join(mood_data.keys())}.")
-        except json.JSONDecodeError: pass
+    moods = []
+    for symptom, dates in log_data.items():
+        if symptom.startswith(MOOD_PREFIX):
+            moods.append(symptom[len(MOOD_PREFIX):])
+        elif dates:
+            summary_points.append(f"- Logged '{symptom}' {len(dates)} times recently.")
+    if moods:
+        summary_points.append(f"- Logged moods including: {', '.join(moods)}.")
     if not summary_points:
         return "No specific symptoms or moods logged recently."
     return "\n".join(summary_points)
 
 
-class BasicQueryAgent:
-    def __init__(self, llm):
-        self.llm = llm
-        self.memory = ConversationBufferMemory()
-        
-    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False):
-        """
-        Runs the agent using the data provided by the orchestrator.
-        """
-        print("BasicQueryAgent running with data from orchestrator.")
-        
-        # Get user name for personalized responses
-        user_name = user_profile.get('name', 'there') if user_profile else 'there'
- 
-        # --- Personalization Logic (now uses passed-in data) ---
-        if user_profile:
-            try:
-                dob = datetime.strptime(user_profile['dob'], '%Y-%m-%d')
-                age = datetime.now().year - dob.year - ((datetime.now().month, datetime.now().day) < (dob.month, dob.day))
-                user_profile['age'] = age
-            except (ValueError, TypeError):
-                user_profile['age'] = 'unknown'
-            profile_details = "\n".join([f"- {key.replace('_', ' ').title()}: {value}" for key, value in user_profile.items() if pd.notna(value)])
-        else:
-            profile_details = "No user profile available."
-
-        log_summary = summarize_user_logs(user_logs)
-        
-        # Handle short responses differently
-        is_short_response = len(user_query.strip().split()) <= 3 and user_query.lower().strip() in ['yes', 'no', 'ok', 'okay', 'sure', 'maybe', 'fine', 'good', 'bad', 'hello', 'hi']
-        
-        # Create context-aware greeting instructions
-        if is_first_query:
-            greeting_instruction = f"This is {user_name}'s FIRST interaction. Welcome them warmly to Bloom."
-        elif is_short_response:
-            greeting_instruction = f"User gave brief response '{user_query}'. Ask for more specific details."
-        else:
-            greeting_instruction = f"Returning user {user_name}. Use conversation history appropriately."
-            
-        # Simplified, focused prompt
-        prompt = f"""You are Bloom, a menopause wellness guide for women.
+# Input token budget for this agent's prompt (see agents/prompt_budget.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("BASIC_QUERY_PROMPT_TOKEN_BUDGET", "1000"))
+
+PROMPT_TEMPLATE = """You are Bloom, a menopause wellness guide for women.
 
 USER PROFILE: {profile_details}
 RECENT SYMPTOMS: {log_summary}
-CONVERSATION HISTORY: {conversation_context or "No previous conversation history."}
+CONVERSATION HISTORY: {context_text}
 
 USER'S QUESTION: "{user_query}"
 
 INSTRUCTIONS:
 - Answer ONLY the user's actual question: "{user_query}"
-- Take the context from {profile_details} and {log_summary} to give more personalized response.
+- Use the USER PROFILE and RECENT SYMPTOMS above to give a more personalized response.
 - If user says just "yes/no", ask them to be more specific
 - Use conversation history for context but don't repeat it
 - Keep response under 70 words
@@ -113,8 +57,58 @@ INSTRUCTIONS:
     - *Do not add* Greetings 
     - Give a direct answer to their question.
 Your response:"""
+
+
+class BasicQueryAgent:
+    prompt_template = PROMPT_TEMPLATE
+    profile_format = "details"
+
+    def __init__(self, llm):
+        self.llm = llm
         
-        response = self.llm.invoke(prompt)
-        cleaned_response = response.strip()
-        self.memory.save_context({"input": user_query}, {"output": cleaned_response})
-        return cleaned_response
\ No newline at end of file
+    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None, llm=None):
+        """
+        Runs the agent using the data provided by the orchestrator.
+        A caller's llm replaces the agent's own, e.g. for a channel's generation profile.
+        """
+        print("BasicQueryAgent running with data from orchestrator.")
+        prompt = self.build_prompt(user_query, user_profile, user_logs, conversation_context, is_first_query, log_summary, profile_text)
+        
+        try:
+            response = (llm or self.llm).invoke(prompt)
+        except Exception as e:
+            print(f"Error in basic query agent: {e}")
+            # Degraded answer when the LLM times out or the circuit breaker is open
+            return {
+                "output": "I'm sorry, I'm having trouble answering right now. Please try again in a moment.",
+                "agent_type": "basic_query",
+                "error": True
+            }
+        return self.postprocess(response, user_query)
+
+    def postprocess(self, response, user_query):
+        """Turn the raw completion into the agent's answer text."""
+        return response.strip()
+
+    def build_prompt(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None):
+        """Render the prompt for a query; shared by run() and the streaming pipeline."""
+        # The orchestrator passes the per-user cached block; render it here otherwise
+        profile_details = profile_text if profile_text is not None else render_profile_details(user_profile)
+
+        if log_summary is None:
+            log_summary = summarize_user_logs(user_logs)
+
+        # Simplified, focused prompt; history is trimmed first, then the profile
+        context_text = conversation_context or "No previous conversation history."
+        prompt, _ = assemble_prompt(
+            PROMPT_TEMPLATE,
+            PROMPT_TOKEN_BUDGET,
+            [
+                PromptSection("log_summary", log_summary, priority=3),
+                PromptSection("profile_details", profile_details, priority=2),
+                PromptSection("context_text", context_text, priority=1, keep="tail"),
+            ],
+            agent_name="basic_query",
+            user_query=user_query,
+        )
+        return prompt
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.classifier import CATEGORIES
+
+# --- Batch question answering ---
+# Answers a list of (query, user_id) items in one request. Confident queries are
+# categorized by the local classifier and the ambiguous ones in a single LLM call per
+# chunk. Items are then grouped by target agent (each agent is built once up front) and
+# run over a bounded pool shared by all batches. Items of the same user run one after
+# another, in request order, so each answer sees the previous exchange in its history.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+BATCH_CLASSIFY_CHUNK = int(os.getenv("BATCH_CLASSIFY_CHUNK", "20"))
+
+BATCH_CATEGORIZATION_PROMPT = """You are an intelligent query categorization system for a menopause health and wellness assistant.
+Categorize each numbered user query into one of the following categories:
+
+1. BASIC_QUERY: General questions about menopause symptoms, causes, stages, general information, or educational content about menopause
+2. CONSULTATION: Questions seeking medical advice, symptom diagnosis, treatment recommendations, medication inquiries, or health-related inquiries
+3. DIET: Questions about diet recommendations, nutrition, foods to eat/avoid, meal planning, supplements, weight management, or dietary recommendations for menopause
+4. EXERCISE: Questions about physical activity, workout routines, fitness plans, specific exercises, or physical movement recommendations for menopause
+
+USER QUERIES:
+{queries}
+
+# MUST FOLLOW: Answer with one line per query, in the same order, as "<number>. <CATEGORY>"
+FOR EXAMPLE
+1. BASIC_QUERY
+2. DIET
+
+Categories:
+"""
+
+_CATEGORY_LINE = re.compile(r"(\d+)\s*[.):\-]?\s*(" + "|".join(CATEGORIES) + r")")
+
+
+class BatchRunner:
+    """Runs batches of queries through an Orchestrator's categorize-and-route pipeline."""
+
+    def __init__(self, orchestrator, workers=BATCH_WORKERS, max_items=BATCH_MAX_ITEMS):
+        self.orchestrator = orchestrator
+        self.max_items = max_items
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+
+    def _categorize_chunk(self, queries):
+        """One LLM call for a chunk of queries; returns {position: category}."""
+        numbered = "\n".join(f"{number}. {query}" for number, query in enumerate(queries, 1))
+        llm = self.orchestrator.registry.get_llm("batch_classifier")
+        response = llm.invoke(BATCH_CATEGORIZATION_PROMPT.format(queries=numbered))
+        categories = {}
+        for match in _CATEGORY_LINE.finditer(response.upper()):
+            categories.setdefault(int(match.group(1)) - 1, match.group(2))
+        return categories
+
+    def categorize(self, queries):
+        """
+        Category for every query. Identical ambiguous queries are sent to the LLM once;
+        anything the LLM leaves out (or a failed call) keeps the local classifier's guess.
+        """
+        classifier = self.orchestrator.registry.classifier
+        resolved, ambiguous = {}, []
+        for query in dict.fromkeys(queries):
+            category, confidence = classifier.classify(query)
+            resolved[query] = category
+            if not classifier.is_confident(confidence):
+                ambiguous.append(query)
+
+        for start in range(0, len(ambiguous), BATCH_CLASSIFY_CHUNK):
+            chunk = ambiguous[start:start + BATCH_CLASSIFY_CHUNK]
+            try:
+                categories = self._categorize_chunk(chunk)
+            except Exception as e:
+                print(f"Batch categorization unavailable ({e}); using the local classifier.")
+                continue
+            for position, category in categories.items():
+                if position < len(chunk):
+                    resolved[chunk[position]] = category
+        return [resolved[query] for query in queries]
+
+    def _run_user(self, entries):
+        """Answer one user's items in order."""
+        results = []
+        for index, category, query, user_id in entries:
+            started = time.perf_counter()
+            result = {"index": index, "user_id": user_id, "query": query, "category": category}
+            try:
+                result["response"], failed = self.orchestrator.answer_query(category, query, user_id)
+                if failed:
+                    # The response is the agent's canned apology, not an answer
+                    result["error"] = "The model is unavailable, a fallback response was returned"
+                    result["status"] = "error"
+                else:
+                    result["status"] = "success"
+            except Exception as e:
+                print(f"Batch item {index} failed: {e}")
+                result["error"] = str(e)
+                result["status"] = "error"
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            results.append(result)
+        return results
+
+    def run(self, items):
+        """
+        Answer items (dicts with "query" and "user_id"). Returns one result per item,
+        in request order, each with a "status" of "success" or "error".
+        """
+        if len(items) > self.max_items:
+            raise ValueError(f"A batch may contain at most {self.max_items} items")
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            query = str(item.get("query") or "").strip() if isinstance(item, dict) else ""
+            user_id = str(item.get("user_id") or "").strip() if isinstance(item, dict) else ""
+            if not query or not user_id:
+                results[index] = {"index": index, "status": "error",
+                                  "error": 'Each item must include a non-empty "query" and "user_id"'}
+                continue
+            valid.append((index, query, user_id))
+
+        categories = self.categorize([query for _, query, _ in valid])
+
+        # Build every agent the batch needs before fanning out
+        by_agent = {}
+        for (index, query, user_id), category in zip(valid, categories):
+            by_agent.setdefault(category, []).append((index, category, query, user_id))
+        for category in by_agent:
+            self.orchestrator.registry.get_agent(category)
+
+        # One task per user; users are submitted agent by agent so same-agent work runs together
+        by_user = {}
+        for category in by_agent:
+            for entry in by_agent[category]:
+                by_user.setdefault(entry[3], []).append(entry)
+        futures = [self._executor.submit(self._run_user, sorted(entries)) for entries in by_user.values()]
+        for future in futures:
+            for result in future.result():
+                results[result["index"]] = result
+        return results
@@ -0,0 +1,218 @@
+"""
+Offline bulk answering for evaluation and content generation runs.
+
+Reads queries from JSONL, answers each one through the same categorize-and-route pipeline
+as Orchestrator.run_categorization_pipeline and appends the answers to a JSONL output
+file as they finish. The output doubles as the checkpoint: rerunning with the same output
+skips every item already answered successfully, so an interrupted run resumes where it
+stopped. Failed items, including degraded fallback answers after an LLM timeout or an open
+circuit breaker, are retried on the next run and their old error records removed, so an
+id appears at most once: its answer, or the error from the latest run. Items of the same
+user run in input order; different users run concurrently on a thread or process pool.
+A throughput and latency report is printed at the end.
+
+Input lines: {"id": ..., "query": ..., "user_id": ...}. "id" defaults to the line number
+and "user_id" to a per-item id (each item then starts with an empty history).
+
+Usage:
+    python -m agents.bulk_answer queries.jsonl answers.jsonl
+    python -m agents.bulk_answer queries.jsonl answers.jsonl --workers 16
+    python -m agents.bulk_answer queries.jsonl answers.jsonl --processes 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Orchestrator of this process (one per worker process with --processes)
+_orchestrator = None
+
+
+def _init_worker():
+    global _orchestrator
+    from agents.orchestrator import Orchestrator
+
+    _orchestrator = Orchestrator()
+
+
+def _answer_chain(entries):
+    """Answer one user's items in order; returns one output record per item."""
+    records = []
+    for item_id, query, user_id in entries:
+        started = time.perf_counter()
+        record = {"id": item_id, "user_id": user_id, "query": query}
+        try:
+            category = _orchestrator.resolve_category(query)
+            record["category"] = category
+            record["response"], failed = _orchestrator.answer_query(category, query, user_id)
+            if failed:
+                # A canned apology is not an answer; leave the item for the next run
+                record["error"] = "The model is unavailable, a fallback response was returned"
+                record["status"] = "error"
+            else:
+                record["status"] = "success"
+        except Exception as e:
+            record["error"] = str(e)
+            record["status"] = "error"
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        records.append(record)
+    return records
+
+
+def read_items(path):
+    """Yield (id, query, user_id) for every input line with a query."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            query = str(item.get("query") or "").strip()
+            if not query:
+                print(f"   - Line {line_number}: no query, skipped")
+                continue
+            item_id = str(item.get("id", line_number))
+            yield item_id, query, str(item.get("user_id") or f"bulk-{item_id}")
+
+
+def prepare_output(path):
+    """
+    Ids already answered successfully in an existing output file. The file is compacted
+    first: a partial last line left by an interrupted run, error records (those items are
+    answered again) and repeated ids are dropped, so every id appears at most once and new
+    records never get glued onto a cut-off line.
+    """
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    kept, dropped = [], 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                dropped += 1
+                continue
+            if record.get("status") != "success" or str(record["id"]) in finished:
+                dropped += 1
+                continue
+            finished.add(str(record["id"]))
+            kept.append(line if line.endswith("\n") else line + "\n")
+    if dropped:
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(temporary, path)
+        print(f"   - Dropped {dropped} partial, failed or repeated records from {path}")
+    return finished
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, int(round(fraction * len(ordered))) - 1)]
+
+
+def latency_report(latencies):
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "max": max(latencies) if latencies else None,
+    }
+
+
+def run(items, output_path, executor, window):
+    """Answer items on executor, appending records to output_path as chains finish."""
+    chains = {}
+    for item in items:
+        chains.setdefault(item[2], []).append(item)
+    pending_chains = iter(chains.values())
+
+    latencies, categories = [], {}
+    succeeded = failed = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        in_flight = set()
+        while True:
+            # Keep a bounded number of chains queued so huge inputs are not submitted at once
+            for chain in pending_chains:
+                in_flight.add(executor.submit(_answer_chain, chain))
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for record in future.result():
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    if record["status"] == "success":
+                        succeeded += 1
+                        latencies.append(record["seconds"])
+                        categories[record["category"]] = categories.get(record["category"], 0) + 1
+                    else:
+                        failed += 1
+                        print(f"   - {record['id']} failed: {record['error']}")
+            out.flush()
+            print(f"   - {succeeded + failed}/{len(items)} answered", end="\r")
+    print()
+    return {"succeeded": succeeded, "failed": failed, "categories": categories,
+            "latency_seconds": latency_report(latencies)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries through the orchestrator.")
+    parser.add_argument("input", help="JSONL file with one {\"query\", \"user_id\", \"id\"} object per line")
+    parser.add_argument("output", help="JSONL file answers are appended to (and resumed from)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Concurrent users when running on threads (default: 8)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Worker processes, each with its own orchestrator (default: threads only)")
+    parser.add_argument("--limit", type=int, help="Answer at most this many pending items")
+    parser.add_argument("--report", help="Also write the final report to this JSON file")
+    args = parser.parse_args(argv)
+
+    items = list(read_items(args.input))
+    finished = prepare_output(args.output)
+    pending = [item for item in items if item[0] not in finished]
+    skipped = len(items) - len(pending)
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"1. {len(items)} items, {skipped} already answered, {len(pending)} to run")
+
+    started = time.perf_counter()
+    if args.processes:
+        print(f"2. Answering with {args.processes} processes...")
+        # Each process answers one chain at a time; threads inside a process would share its GIL
+        executor = ProcessPoolExecutor(max_workers=args.processes, initializer=_init_worker)
+        window = args.processes * 4
+    else:
+        print(f"2. Answering with {args.workers} threads...")
+        _init_worker()
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+        window = args.workers * 4
+    with executor:
+        stats = run(pending, args.output, executor, window)
+    elapsed = time.perf_counter() - started
+
+    answered = stats["succeeded"] + stats["failed"]
+    report = dict(stats, items=answered, skipped=skipped, elapsed_seconds=round(elapsed, 2),
+                  items_per_minute=round(answered / elapsed * 60, 1) if elapsed else 0.0)
+    latency = report["latency_seconds"]
+    print(f"\n✅ {stats['succeeded']} answered, {stats['failed']} failed in {elapsed:.1f}s "
+          f"({report['items_per_minute']} items/min)")
+    if latency["p50"] is not None:
+        print(f"   latency p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, max {latency['max']:.2f}s")
+    print(f"   categories: {stats['categories']}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
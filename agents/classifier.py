@@ -0,0 +1,81 @@
+import os
+import re
+
+# --- Local query classifier ---
+# A small linear model over keyword/phrase features: every matching pattern adds its weight
+# to a category score. Confidence is the winning share of the top two scores, so a query
+# that clearly mentions food is routed locally while "what should I do about hot flashes
+# and my diet" is left to the LLM categorizer.
+CATEGORIES = ("BASIC_QUERY", "CONSULTATION", "DIET", "EXERCISE")
+
+CLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Minimum evidence before the classifier is trusted at all
+MIN_SCORE = 1.0
+
+CATEGORY_FEATURES = {
+    "DIET": [
+        (r"\bdiet(s|ary)?\b", 3.0),
+        (r"\b(food|foods|meal|meals|recipe|recipes|snack|snacks|breakfast|lunch|dinner)\b", 3.0),
+        (r"\b(eat|eating|ate|drink|drinking)\b", 2.0),
+        (r"\bnutri(tion|tional|ent|ents)\b", 3.0),
+        (r"\b(supplement|supplements|vitamin|vitamins|calcium|magnesium|omega|protein|fiber|fibre)\b", 2.5),
+        (r"\b(caffeine|coffee|alcohol|sugar|soy|dairy|carbs?|calories)\b", 1.5),
+        (r"\bweight (gain|loss|management)\b|\blose weight\b", 1.5),
+    ],
+    "EXERCISE": [
+        (r"\b(exercise|exercises|exercising|workout|workouts|fitness)\b", 3.0),
+        (r"\b(yoga|pilates|cardio|gym|swim|swimming|cycling|running|jogging|walking|stretch(es|ing)?)\b", 2.5),
+        (r"\bstrength training\b|\blift(ing)? weights\b|\bresistance training\b", 3.0),
+        (r"\bphysical(ly)? activ(e|ity)\b|\bwork out\b|\bsteps\b", 2.5),
+        (r"\b(muscle|muscles|bone density|balance)\b", 1.0),
+    ],
+    "CONSULTATION": [
+        (r"\b(treatment|treatments|treat|therapy|hrt|medication|medications|medicine|prescri\w+|dose|dosage)\b", 3.0),
+        (r"\b(side effects?|diagnos\w+|is it normal|should i (take|see|be worried)|worried|concerned)\b", 2.5),
+        (r"\b(i am|i'm|im) (experiencing|having|suffering|feeling)\b|\bi (have|get|feel|keep)\b", 2.0),
+        (r"\b(what can i do|how (can|do) i (manage|cope|stop|reduce|relieve|deal))\b", 2.0),
+        (r"\b(relief|relieve|remed(y|ies)|manage|cope|pain|bleeding|insomnia|can't sleep)\b", 1.5),
+        (r"\bmy (symptoms|periods?|hot flash(es)?|night sweats|mood|sleep)\b", 1.5),
+    ],
+    "BASIC_QUERY": [
+        (r"^(hi|hello|hey|good (morning|afternoon|evening))\b", 3.0),
+        (r"\b(what is|what are|what's|define|definition|explain|meaning of)\b", 1.5),
+        (r"\b(why does|why do|when does|when do|how long|at what age|what age)\b", 1.5),
+        (r"\b(stages?|phases?|causes?|signs|symptoms of|perimenopause|postmenopause|premenopause)\b", 1.5),
+        (r"\b(menopause|hot flash(es)?|night sweats?|estrogen|oestrogen|hormones?)\b", 0.5),
+    ],
+}
+
+
+class QueryClassifier:
+    """In-process BASIC_QUERY / CONSULTATION / DIET / EXERCISE classifier."""
+
+    def __init__(self, features=None, threshold=CLASSIFIER_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.features = {
+            category: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+            for category, patterns in (features or CATEGORY_FEATURES).items()
+        }
+
+    def scores(self, query):
+        """Return the raw per-category feature score for a query."""
+        text = query.strip()
+        return {
+            category: sum(weight for pattern, weight in patterns if pattern.search(text))
+            for category, patterns in self.features.items()
+        }
+
+    def classify(self, query):
+        """
+        Return (category, confidence). Confidence is 0.0 when no feature matched,
+        otherwise the top score's share of the top two scores.
+        """
+        ranked = sorted(self.scores(query).items(), key=lambda item: item[1], reverse=True)
+        (category, top), (_, second) = ranked[0], ranked[1]
+        if top < MIN_SCORE:
+            return "BASIC_QUERY", 0.0
+        return category, top / (top + second)
+
+    def is_confident(self, confidence):
+        return confidence >= self.threshold
@@ -1,46 +1,38 @@
 import os
 from dotenv import load_dotenv
-from langchain_ibm import WatsonxLLM
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.prompts import PromptTemplate
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
+from agents.prompt_context import render_profile_repr
+from agents.prompt_budget import PromptSection, assemble_prompt
 
 load_dotenv()
 
-url = os.getenv("URL")
-apikey = os.getenv("API_KEY")
-project_id = os.getenv("PROJECT_ID")
 
-# Initialize the LLM
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    apikey=apikey,
-    project_id=project_id,
-    params={
-        GenParams.DECODING_METHOD: "greedy",
-        GenParams.TEMPERATURE: 0.1,
-        GenParams.MIN_NEW_TOKENS: 10,
-        GenParams.MAX_NEW_TOKENS: 200,
-        GenParams.STOP_SEQUENCES: [
-            "Human:", 
-            "Observation", 
-            "Question:",
-            "USER:",
-            "ASSISTANT:",
-            "User previously asked:",
-            "You previously responded:",
-            "Consult",
-            "consult",
-            "healthcare provider",
-            "medical professional",
-            "doctor"
-        ],
-    },
-)
+# Input token budget for this agent's prompt (see agents/prompt_budget.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("CONSULTATION_PROMPT_TOKEN_BUDGET", "800"))
+
+PROMPT_TEMPLATE = """You are Bloom, a compassionate menopause wellness companion who helps women understand their experiences.
+
+USER PROFILE: {profile_text}
+USER SYMPTOMS: {logs_text}
+CONVERSATION HISTORY: {context_text}
+
+USER'S QUESTION: "{user_query}"
+
+RESPONSE REQUIREMENTS:
+- Share practical wellness strategies and lifestyle approaches
+- Suggest specific remedies, self-care practices, or symptom management techniques
+- Be warm, understanding, and supportive
+- Give complete, helpful information
+- Keep response under 80 words
+- Avoid medical disclaimers or referral language
+- Focus on actionable advice and reassurance
+
+Your supportive response:"""
 
 
 class ConsultationAgent:
+    prompt_template = PROMPT_TEMPLATE
+    profile_format = "repr"
+
     def __init__(self, llm):
         self.llm = llm
         print("Consultation Agent Initialized")
@@ -82,40 +74,43 @@ class ConsultationAgent:
         
         return cleaned_response
     
-    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False):
-        """Run the consultation agent with user context"""
-        
+    def postprocess(self, response, user_query):
+        """Turn the raw completion into the agent's answer text."""
+        return self._clean_response_and_add_followup(response, user_query)
+
+    def build_prompt(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None):
+        """Render the prompt for a query; shared by run() and the streaming pipeline."""
         # Format user context
-        profile_text = str(user_profile) if user_profile else "No user profile available"
-        logs_text = str(user_logs) if user_logs else "No previous interaction history"
+        if profile_text is None:
+            profile_text = render_profile_repr(user_profile)
+        # Prefer the precomputed summary over the raw per-date logs
+        logs_text = log_summary or (str(user_logs) if user_logs else "No previous interaction history")
         context_text = conversation_context or "No previous conversation history"
         
-        # Simplified prompt
-        prompt = f"""You are Bloom, a compassionate menopause wellness companion who helps women understand their experiences.
-
-USER PROFILE: {profile_text}
-USER SYMPTOMS: {logs_text}
-CONVERSATION HISTORY: {context_text}
+        # Simplified prompt; history is trimmed first, then the profile
+        prompt, _ = assemble_prompt(
+            PROMPT_TEMPLATE,
+            PROMPT_TOKEN_BUDGET,
+            [
+                PromptSection("logs_text", logs_text, priority=3),
+                PromptSection("profile_text", profile_text, priority=2),
+                PromptSection("context_text", context_text, priority=1, keep="tail"),
+            ],
+            agent_name="consultation",
+            user_query=user_query,
+        )
+        return prompt
 
-USER'S QUESTION: "{user_query}"
-
-RESPONSE REQUIREMENTS:
-- Share practical wellness strategies and lifestyle approaches
-- Suggest specific remedies, self-care practices, or symptom management techniques
-- Be warm, understanding, and supportive
-- Give complete, helpful information
-- Keep response under 80 words
-- Avoid medical disclaimers or referral language
-- Focus on actionable advice and reassurance
-
-Your supportive response:"""
+    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None, llm=None):
+        """Run the consultation agent with user context"""
+        prompt = self.build_prompt(user_query, user_profile, user_logs, conversation_context, is_first_query, log_summary, profile_text)
         
         # Get response from LLM
         try:
-            response = self.llm.invoke(prompt)
+            response = (llm or self.llm).invoke(prompt)
             
             # Clean response and ensure follow-up question
-            cleaned_response = self._clean_response_and_add_followup(response, user_query)
+            cleaned_response = self.postprocess(response, user_query)
             
             return {
                 "output": cleaned_response,
@@ -132,6 +127,10 @@ Your supportive response:"""
 
 # Initialize the LLM
 if __name__ == "__main__":
+    from agents.llm_factory import get_llm
+
+    llm = get_llm("consultation")
+
     # Create the agent
     agent = ConsultationAgent(llm)
     
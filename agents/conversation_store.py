@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+
+# --- Bounded per-user conversation memory ---
+# Each user keeps a fixed-size ring buffer of recent messages, and the number of users is
+# capped with least-recently-used eviction plus an idle timeout, so memory stays flat on a
+# long-running server no matter how many distinct users it sees.
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "20"))
+CONVERSATION_MAX_USERS = int(os.getenv("CONVERSATION_MAX_USERS", "10000"))
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", str(6 * 60 * 60)))
+
+
+class ConversationStore:
+    """
+    Thread-safe map of user_id -> ring buffer of alternating user/assistant messages.
+    With a session_store the buffers are also persisted under `namespace`, reloaded once
+    they are older than the store's cache TTL, so several worker processes and restarts
+    see the same history. Concurrent writers for one user are last-writer-wins. Reloads
+    read the session store outside the lock, so one slow read does not block every user.
+    """
+
+    def __init__(self, max_messages=CONVERSATION_MAX_MESSAGES, max_users=CONVERSATION_MAX_USERS,
+                 idle_ttl_seconds=CONVERSATION_IDLE_TTL, session_store=None, namespace="conversation"):
+        self.max_messages = max_messages
+        self.max_users = max_users
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.session_store = session_store
+        self.namespace = namespace
+        # user_id -> {"messages": deque, "last_seen": float, "synced": float, "bytes": int}
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evicted_users = 0
+
+    def append_exchange(self, user_id, user_query, assistant_response):
+        """Record one user message and the assistant's reply."""
+        loaded = self._load(user_id)
+        now = time.monotonic()
+        with self._lock:
+            history = self._lookup(user_id, loaded)
+            if history is None:
+                history = self._new_history(user_id, now)
+            for message in (user_query, assistant_response):
+                messages = history["messages"]
+                if len(messages) == messages.maxlen:
+                    # The oldest message falls off the ring buffer
+                    self._account(history, -sys.getsizeof(messages[0]))
+                messages.append(message)
+                self._account(history, sys.getsizeof(message))
+            history["last_seen"] = now
+            # This write is now the latest state; reads that started earlier must not replace it
+            history["synced"] = now
+            self._histories.move_to_end(user_id)
+            self._evict(now)
+            if self.session_store is not None:
+                self.session_store.put(self.namespace, user_id, list(history["messages"]))
+
+    def recent(self, user_id, count):
+        """Return up to the last `count` messages for a user, oldest first."""
+        loaded = self._load(user_id)
+        with self._lock:
+            history = self._lookup(user_id, loaded)
+            if history is None:
+                return []
+            messages = history["messages"]
+            return list(messages)[-count:] if count < len(messages) else list(messages)
+
+    def has_history(self, user_id):
+        loaded = self._load(user_id)
+        with self._lock:
+            history = self._lookup(user_id, loaded)
+            return history is not None and len(history["messages"]) > 0
+
+    def _stale(self, history, now):
+        return (history is None or now - history["last_seen"] > self.idle_ttl_seconds
+                or now - history["synced"] > self.session_store.cache_ttl)
+
+    def _load(self, user_id):
+        """
+        Read the persisted messages when the local copy is missing or stale, without
+        holding the lock. Returns (read_started, messages or None), or None when the
+        local copy is fresh.
+        """
+        if self.session_store is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if not self._stale(self._histories.get(user_id), now):
+                return None
+        # Pick up messages written by other workers or before a restart
+        return now, self.session_store.get(self.namespace, user_id)
+
+    def _lookup(self, user_id, loaded=None):
+        now = time.monotonic()
+        history = self._histories.get(user_id)
+        if history is not None and now - history["last_seen"] > self.idle_ttl_seconds:
+            self._drop(user_id)
+            history = None
+        if loaded is not None:
+            read_started, stored = loaded
+            # Skip a read that started before this copy was last written or refreshed
+            if history is None or history["synced"] < read_started:
+                if stored is None and history is None:
+                    return None
+                if stored is not None:
+                    if history is None:
+                        history = self._new_history(user_id, read_started)
+                    self._replace(history, stored)
+                history["synced"] = read_started
+        if history is None:
+            return None
+        history["last_seen"] = now
+        self._histories.move_to_end(user_id)
+        return history
+
+    def _new_history(self, user_id, now):
+        history = {"messages": deque(maxlen=self.max_messages), "last_seen": now, "synced": now, "bytes": 0}
+        self._histories[user_id] = history
+        return history
+
+    def _replace(self, history, messages):
+        self._account(history, -history["bytes"])
+        history["messages"].clear()
+        history["messages"].extend(messages)
+        self._account(history, sum(sys.getsizeof(message) for message in history["messages"]))
+
+    def _account(self, history, delta):
+        history["bytes"] += delta
+        self.total_bytes += delta
+
+    def _drop(self, user_id):
+        history = self._histories.pop(user_id)
+        self.total_bytes -= history["bytes"]
+        self.evicted_users += 1
+
+    def _evict(self, now):
+        # Least recently used users are at the front of the OrderedDict
+        while self._histories:
+            user_id, history = next(iter(self._histories.items()))
+            idle = now - history["last_seen"] > self.idle_ttl_seconds
+            if not idle and len(self._histories) <= self.max_users:
+                break
+            self._drop(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._histories),
+                "max_users": self.max_users,
+                "messages": sum(len(h["messages"]) for h in self._histories.values()),
+                "approx_bytes": self.total_bytes,
+                "evicted_users": self.evicted_users,
+            }
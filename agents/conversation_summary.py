@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+
+from agents.prompt_budget import count_tokens, truncate_to_tokens
+
+# --- Rolling conversation summaries ---
+# Only the latest exchange is replayed verbatim. When a newer exchange replaces it, the
+# older one is folded into a short per-user summary by a background thread, so prompts
+# keep earlier context at a roughly constant size and requests never wait on the
+# summarization call.
+CONVERSATION_SUMMARY_ENABLED = os.getenv("CONVERSATION_SUMMARY", "true").lower() in ("1", "true", "yes")
+CONVERSATION_SUMMARY_QUEUE = int(os.getenv("CONVERSATION_SUMMARY_QUEUE", "1000"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "150"))
+CONVERSATION_VERBATIM_TOKENS = int(os.getenv("CONVERSATION_VERBATIM_TOKENS", "200"))
+SUMMARY_LOCK_STRIPES = 64
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and Bloom, a menopause wellness assistant.
+
+CURRENT SUMMARY: {summary}
+
+NEW EXCHANGES:
+{exchanges}
+
+Write the updated summary in under 80 words. Keep the user's concerns, symptoms, preferences and the advice already given. Do not address the user.
+
+Updated summary:"""
+
+
+class ConversationSummarizer:
+    """
+    Background folding of displaced exchanges into per-user summaries kept in the
+    session store under "<namespace>:summary". Turns queued for the same user while
+    the worker is busy are folded together in one LLM call.
+    """
+
+    def __init__(self, llm, session_store, max_tokens=CONVERSATION_SUMMARY_TOKENS,
+                 capacity=CONVERSATION_SUMMARY_QUEUE):
+        self.llm = llm
+        self.session_store = session_store
+        self.max_tokens = max_tokens
+        self._jobs = queue.Queue(maxsize=capacity)
+        self._pending = {}  # (namespace, user_id) -> [(user_query, assistant_response)]
+        self._lock = threading.Lock()
+        self._fold_locks = [threading.Lock() for _ in range(SUMMARY_LOCK_STRIPES)]
+        self.folded = 0
+        self.llm_calls = 0
+        self.fallbacks = 0
+
+        thread = threading.Thread(target=self._work, name="conversation-summarizer", daemon=True)
+        thread.start()
+
+    def get(self, namespace, user_id):
+        record = self.session_store.get(namespace + ":summary", user_id)
+        return record["summary"] if record else None
+
+    def schedule(self, namespace, user_id, user_query, assistant_response):
+        """Queue one exchange to be folded into the user's summary."""
+        key = (namespace, user_id)
+        with self._lock:
+            turns = self._pending.get(key)
+            if turns is not None:
+                # The worker has not picked this user up yet; fold with the queued turns
+                turns.append((user_query, assistant_response))
+                return
+            self._pending[key] = [(user_query, assistant_response)]
+        try:
+            self._jobs.put_nowait(key)
+        except queue.Full:
+            # Overloaded: keep the context with a cheap extractive fold instead
+            with self._lock:
+                turns = self._pending.pop(key, [])
+            self._fold(key, turns, use_llm=False)
+
+    def _work(self):
+        while True:
+            key = self._jobs.get()
+            with self._lock:
+                turns = self._pending.pop(key, [])
+            try:
+                if turns:
+                    self._fold(key, turns, use_llm=True)
+            except Exception as e:
+                print(f"Conversation summary failed: {e}")
+            finally:
+                self._jobs.task_done()
+
+    def _fold(self, key, turns, use_llm):
+        namespace, user_id = key
+        empty = {"summary": "", "turns": 0}
+        record = self.session_store.get(namespace + ":summary", user_id) or empty
+        summary = None
+        if use_llm:
+            exchanges = "\n".join(
+                f"User: {question}\nBloom: {truncate_to_tokens(answer, CONVERSATION_VERBATIM_TOKENS)}"
+                for question, answer in turns
+            )
+            try:
+                summary = self.llm.invoke(SUMMARY_PROMPT.format(
+                    summary=record["summary"] or "None yet.", exchanges=exchanges
+                )).strip()
+                with self._lock:
+                    self.llm_calls += 1
+            except Exception as e:
+                print(f"Conversation summary LLM call failed, using extractive fallback: {e}")
+
+        # The LLM call runs unlocked; the read-modify-write of the stored summary does not,
+        # so an overflow fold in a request thread and the worker never overwrite each other
+        with self._fold_locks[hash(key) % SUMMARY_LOCK_STRIPES]:
+            current = self.session_store.get(namespace + ":summary", user_id) or empty
+            if summary and current["turns"] != record["turns"]:
+                # Another fold landed meanwhile; add these turns to it instead of replacing it
+                summary = None
+            if not summary:
+                asked = " ".join(f"User asked: {question[:120]}." for question, _ in turns)
+                summary = f"{current['summary']} {asked}".strip()
+                with self._lock:
+                    self.fallbacks += 1
+            if count_tokens(summary) > self.max_tokens:
+                # Older content is at the front of an extractive summary
+                summary = truncate_to_tokens(summary, self.max_tokens, keep="tail")
+            self.session_store.put(namespace + ":summary", user_id, {
+                "summary": summary,
+                "turns": current["turns"] + len(turns),
+            })
+        with self._lock:
+            self.folded += len(turns)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._jobs.qsize(),
+                "folded_turns": self.folded,
+                "llm_calls": self.llm_calls,
+                "fallbacks": self.fallbacks,
+            }
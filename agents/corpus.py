@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+# --- Local snapshot store for the RAG corpus ---
+# Raw responses are stored content-addressed (data/corpus/<sha256>.<ext>) and tracked in a
+# manifest keyed by source URL. Serving processes only ever read from here; fetching is
+# done offline by `python -m agents.ingest`.
+CORPUS_DIR = os.getenv("CORPUS_DIR", os.path.join("data", "corpus"))
+SNAPSHOT_MANIFEST = "manifest.json"
+
+# Same browser-like agent WebBaseLoader sends, some sources reject the requests default
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def read_snapshot_manifest(corpus_dir=CORPUS_DIR):
+    """Return {url: snapshot record} for everything stored locally."""
+    path = os.path.join(corpus_dir, SNAPSHOT_MANIFEST)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_snapshot_manifest(snapshots, corpus_dir=CORPUS_DIR):
+    """Atomically replace the snapshot manifest."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, SNAPSHOT_MANIFEST)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshots, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _snapshot_extension(url, content_type):
+    if "pdf" in (content_type or "").lower() or url.lower().endswith(".pdf"):
+        return ".pdf"
+    return ".html"
+
+
+def fetch_snapshot(url, previous=None, session=None, timeout=30, corpus_dir=CORPUS_DIR):
+    """
+    Download url and store its raw body under its content hash.
+    Sends the previous ETag/Last-Modified so unchanged sources cost a 304 instead of a download.
+    Returns (record, changed).
+    """
+    import requests
+
+    http = session or requests
+    headers = {"User-Agent": USER_AGENT}
+    if previous and os.path.exists(previous.get("path", "")):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    response = http.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and previous:
+        return dict(previous, fetched_at=datetime.now(timezone.utc).isoformat()), False
+    response.raise_for_status()
+
+    body = response.content
+    sha256 = hashlib.sha256(body).hexdigest()
+    content_type = response.headers.get("Content-Type", "")
+    path = os.path.join(corpus_dir, sha256 + _snapshot_extension(url, content_type))
+    if not os.path.exists(path):
+        os.makedirs(corpus_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    record = {
+        "sha256": sha256,
+        "path": path,
+        "content_type": content_type,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+    changed = previous is None or previous.get("sha256") != sha256
+    return record, changed
+
+
+def load_snapshot_documents(url, record):
+    """Parse a stored snapshot into LangChain documents, with the original URL as source."""
+    from langchain_core.documents import Document
+
+    path = record["path"]
+    if path.endswith(".pdf"):
+        from langchain_community.document_loaders import PyPDFLoader
+
+        docs = PyPDFLoader(path).load()
+        for doc in docs:
+            doc.metadata["source"] = url
+        return docs
+
+    from bs4 import BeautifulSoup
+
+    with open(path, "rb") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    metadata = {"source": url}
+    if soup.title and soup.title.string:
+        metadata["title"] = soup.title.string.strip()
+    return [Document(page_content=soup.get_text(), metadata=metadata)]
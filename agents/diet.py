@@ -1,24 +1,11 @@
 import os
 from dotenv import load_dotenv
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_ibm import WatsonxEmbeddings, WatsonxLLM
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
-
-# --- RAG Specific Imports ---
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_ibm import WatsonxEmbeddings, WatsonxLLM
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
+from agents.vector_index import load_or_build_index
+from agents.prompt_context import render_profile_repr
+from agents.prompt_budget import PromptSection, assemble_prompt
 
 load_dotenv()
 
-url = os.getenv("URL")
-apikey = os.getenv("API_KEY")
-project_id = os.getenv("PROJECT_ID")
-
 DIET_LINKS = [
     "https://www.medicalnewstoday.com/articles/perimenopause-diet-and-nutrition",
     "https://pmc.ncbi.nlm.nih.gov/articles/PMC10780928/"
@@ -42,6 +29,12 @@ DIET_LINKS = [
     # "https://health.clevelandclinic.org/menopause-diet"
 ]
 
+# --- Persisted index configuration (a change to any of these triggers a rebuild) ---
+DIET_COLLECTION_NAME = "diet-agent-simple"
+EMBEDDING_MODEL_ID = "ibm/slate-125m-english-rtrvr"
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 30
+
 
 # # Initialize the LLM
 # llm = WatsonxLLM(
@@ -145,22 +138,6 @@ DIET_LINKS = [
 #     )
 #     print(response)
 
-# --- LLM and Embeddings Initialization ---
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    apikey=apikey,
-    project_id=project_id,
-    params={
-        GenParams.DECODING_METHOD: "greedy",
-        GenParams.TEMPERATURE: 0.1,
-        GenParams.MIN_NEW_TOKENS: 50,
-        GenParams.MAX_NEW_TOKENS: 800,  # Increased to allow complete responses
-        # Reduced stop sequences to prevent premature cutting
-        GenParams.STOP_SEQUENCES: ["Human:", "USER'S CURRENT QUESTION:"]
-    },
-)
-
 # embeddings = WatsonxEmbeddings(
 #     model_id="ibm/slate-125m-english-rtrvr",
 #     url=url,
@@ -169,20 +146,46 @@ llm = WatsonxLLM(
 # )
 
 
+# Input token budget for this agent's prompt (see agents/prompt_budget.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("DIET_PROMPT_TOKEN_BUDGET", "1200"))
+
+PROMPT_TEMPLATE = """You are Bloom, a supportive nutrition guide specializing in menopause wellness and dietary strategies.
+
+USER PROFILE: {profile_text}
+USER SYMPTOMS: {logs_text}
+CONVERSATION HISTORY: {context_text}
+USER'S QUESTION: "{user_query}"
+
+RELEVANT DIETARY INFORMATION FROM RESEARCH:
+{dietary_info}
+
+INSTRUCTIONS:
+- Provide practical, actionable dietary advice based on the user's profile and symptoms
+- Suggest specific foods, meal ideas, and nutrition strategies for menopause wellness
+- Focus on foods that help with symptoms and overall health
+- Use bullet points for clear organization
+- Keep response under 200 words
+- Be empathetic and encouraging
+- Don't use markdown formatting
+- Share helpful nutrition guidance
+
+Your supportive response:"""
+
+
 class DietAgent:
-    def __init__(self, llm: WatsonxLLM):
+    prompt_template = PROMPT_TEMPLATE
+    profile_format = "repr"
+
+    def __init__(self, llm):
+        from agents.llm_factory import get_embeddings
+
         self.llm = llm
         
         print("1. Initializing Diet Agent...")
         
-        # Initialize embeddings
+        # Initialize embeddings (shared with the registry's semantic cache)
         self.documents_urls = DIET_LINKS
-        self.embeddings = WatsonxEmbeddings(
-            model_id="ibm/slate-125m-english-rtrvr",
-            url=url,
-            apikey=apikey,
-            project_id=project_id,
-        )
+        self.embeddings = get_embeddings(EMBEDDING_MODEL_ID)
         
         # Set up RAG retriever
         self.retriever = self._setup_rag_retriever()
@@ -191,25 +194,17 @@ class DietAgent:
 
     def _setup_rag_retriever(self):
         print("2. Setting up RAG retriever...")
-        print("   - Loading web documents...")
         try:
-            loader = WebBaseLoader(self.documents_urls)
-            loader.requests_per_second = 2
-            docs = loader.load()
-
-            print(f"   - Splitting {len(docs)} documents...")
-            text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=300, 
-                chunk_overlap=30
-            )
-            doc_splits = text_splitter.split_documents(docs)
-
-            print("   - Creating Chroma vector store...")
-            vectorstore = Chroma.from_documents(
-                documents=doc_splits,
-                embedding=self.embeddings,
-                collection_name="diet-agent-simple"
+            vectorstore = load_or_build_index(
+                collection_name=DIET_COLLECTION_NAME,
+                urls=self.documents_urls,
+                embeddings=self.embeddings,
+                embedding_model_id=EMBEDDING_MODEL_ID,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
             )
+            if vectorstore is None:
+                return None
             return vectorstore.as_retriever(search_kwargs={'k': 3})
         except Exception as e:
             print(f"Error setting up RAG: {e}")
@@ -237,47 +232,49 @@ class DietAgent:
             print(f"Error retrieving information: {e}")
             return "Error retrieving information. Please try again later."
 
-    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False):
-        """Run the diet agent with a simplified approach"""
-        
+    def postprocess(self, response, user_query):
+        """Turn the raw completion into the agent's answer text."""
+        return response
+
+    def build_prompt(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None):
+        """Retrieve dietary context and render the prompt; shared by run() and the streaming pipeline."""
         # Format user context
-        profile_text = str(user_profile) if user_profile else "No user profile available"
-        logs_text = str(user_logs) if user_logs else "No previous symptoms logged"
+        if profile_text is None:
+            profile_text = render_profile_repr(user_profile)
+        # Prefer the precomputed summary over the raw per-date logs
+        logs_text = log_summary or (str(user_logs) if user_logs else "No previous symptoms logged")
         context_text = str(conversation_context) if conversation_context else "This is the first question in the conversation."
 
-        try:
-            # First, get relevant dietary information
-            print(f"Getting dietary information for: {user_query}")
-            dietary_info = self.get_dietary_information(user_query)
-            
-            # Create a comprehensive prompt with context and retrieved information
-            prompt = f"""You are Bloom, a supportive nutrition guide specializing in menopause wellness and dietary strategies.
-
-USER PROFILE: {profile_text}
-USER SYMPTOMS: {logs_text}
-CONVERSATION HISTORY: {context_text}
-USER'S QUESTION: "{user_query}"
-
-RELEVANT DIETARY INFORMATION FROM RESEARCH:
-{dietary_info}
-
-INSTRUCTIONS:
-- Provide practical, actionable dietary advice based on the user's profile and symptoms
-- Suggest specific foods, meal ideas, and nutrition strategies for menopause wellness
-- Focus on foods that help with symptoms and overall health
-- Use bullet points for clear organization
-- Keep response under 200 words
-- Be empathetic and encouraging
-- Don't use markdown formatting
-- Share helpful nutrition guidance
+        # First, get relevant dietary information
+        print(f"Getting dietary information for: {user_query}")
+        dietary_info = self.get_dietary_information(user_query)
+        
+        # Create a comprehensive prompt with context and retrieved information;
+        # retrieved research is kept longest, conversation history is trimmed first
+        prompt, _ = assemble_prompt(
+            PROMPT_TEMPLATE,
+            PROMPT_TOKEN_BUDGET,
+            [
+                PromptSection("dietary_info", dietary_info, priority=4),
+                PromptSection("logs_text", logs_text, priority=3),
+                PromptSection("profile_text", profile_text, priority=2),
+                PromptSection("context_text", context_text, priority=1, keep="tail"),
+            ],
+            agent_name="diet",
+            user_query=user_query,
+        )
+        return prompt
 
-Your supportive response:"""
+    def run(self, user_query, user_profile=None, user_logs=None, conversation_context=None, is_first_query=False, log_summary=None, profile_text=None, llm=None):
+        """Run the diet agent with a simplified approach"""
+        try:
+            prompt = self.build_prompt(user_query, user_profile, user_logs, conversation_context, is_first_query, log_summary, profile_text)
 
             # Get response from LLM
-            response = self.llm.invoke(prompt)
+            response = (llm or self.llm).invoke(prompt)
             
             return {
-                "output": response,
+                "output": self.postprocess(response, user_query),
                 "agent_type": "diet_agent_simplified",
                 "user_context_used": True
             }
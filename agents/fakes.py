@@ -0,0 +1,176 @@
+import os
+import re
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from agents.classifier import CATEGORIES
+
+# --- Deterministic local stand-ins for watsonx.ai and Twilio ---
+# Selected with LLM_BACKEND=fake, EMBEDDINGS_BACKEND=hash and TWILIO_BACKEND=fake, so the
+# whole stack can be load-tested and profiled offline. Output text and latency are derived
+# from a hash of the prompt (plus FAKE_SEED): the same workload gives the same answers and
+# the same simulated timings on every run.
+FAKE_SEED = os.getenv("FAKE_SEED", "0")
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))  # time to first token, seconds
+FAKE_LLM_LATENCY_DIST = os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal")  # fixed | uniform | lognormal
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_EMBEDDING_DIM = int(os.getenv("FAKE_EMBEDDING_DIM", "384"))
+FAKE_TWILIO_LATENCY = float(os.getenv("FAKE_TWILIO_LATENCY", "0.05"))
+
+_WORDS = ("menopause symptoms sleep estrogen hot flashes mood energy bones heart calcium "
+          "protein walking strength yoga fiber water rest balance hormones support routine "
+          "vegetables whole grains stress breathing doctor changes body healthy daily").split()
+
+
+def _rng(*parts):
+    digest = hashlib.sha256("\x1f".join([FAKE_SEED, *map(str, parts)]).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def sample_latency(rng, mean=FAKE_LLM_LATENCY, dist=FAKE_LLM_LATENCY_DIST, spread=FAKE_LLM_LATENCY_SPREAD):
+    """Seconds drawn from the configured distribution. lognormal: median mean, sigma spread."""
+    if dist == "fixed" or mean <= 0:
+        return max(0.0, mean)
+    if dist == "uniform":
+        return max(0.0, rng.uniform(mean * (1 - spread), mean * (1 + spread)))
+    if dist == "lognormal":
+        return rng.lognormvariate(math.log(mean), spread)
+    raise ValueError(f"Unknown FAKE_LLM_LATENCY_DIST: {dist}")
+
+
+class FakeLLM(LLM):
+    """
+    LangChain LLM that sleeps like a remote model and returns deterministic text.
+    The classifier profiles answer with category names so routing still works.
+    """
+
+    profile: str = "basic"
+    min_new_tokens: int = 10
+    max_new_tokens: int = 150
+    latency: float = FAKE_LLM_LATENCY
+    latency_dist: str = FAKE_LLM_LATENCY_DIST
+    latency_spread: float = FAKE_LLM_LATENCY_SPREAD
+    tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND
+    failure_rate: float = FAKE_LLM_FAILURE_RATE
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"profile": self.profile, "max_new_tokens": self.max_new_tokens, "seed": FAKE_SEED}
+
+    def _tokens(self, prompt, rng):
+        if self.profile == "classifier":
+            return [rng.choice(CATEGORIES)]
+        if self.profile == "batch_classifier":
+            section = prompt.split("USER QUERIES:", 1)[-1].split("# MUST FOLLOW", 1)[0]
+            numbers = re.findall(r"^(\d+)\. ", section, flags=re.MULTILINE)
+            return [f"{number}. {rng.choice(CATEGORIES)}\n" for number in numbers]
+        count = rng.randint(min(self.min_new_tokens, self.max_new_tokens), self.max_new_tokens)
+        return [rng.choice(_WORDS) + ("." if i % 12 == 11 else "") + " " for i in range(count)]
+
+    def _generate_tokens(self, prompt):
+        rng = _rng(self.profile, prompt)
+        first_token = sample_latency(rng, self.latency, self.latency_dist, self.latency_spread)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            time.sleep(first_token)
+            raise ConnectionError("Simulated LLM backend failure")
+        time.sleep(first_token)
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for index, token in enumerate(self._tokens(prompt, rng)):
+            if index and interval:
+                time.sleep(interval)
+            yield token
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return "".join(self._generate_tokens(prompt)).strip()
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        for token in self._generate_tokens(prompt):
+            chunk = GenerationChunk(text=token)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Feature-hashed bag of words, L2-normalized. Deterministic and instant; texts that
+    share words get similar vectors, so retrieval and the semantic cache behave plausibly.
+    """
+
+    def __init__(self, dim=FAKE_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "big") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class _FakeMessage:
+    def __init__(self, sid, body, from_, to):
+        self.sid = sid
+        self.body = body
+        self.from_ = from_
+        self.to = to
+        self.status = "queued"
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, body, from_, to, **kwargs):
+        return self._client._send(body, from_, to)
+
+
+class FakeTwilioClient:
+    """
+    In-process stand-in for twilio.rest.Client: messages.create() waits FAKE_TWILIO_LATENCY
+    and records the message instead of sending it. The last messages are kept in .sent.
+    """
+
+    def __init__(self, latency=FAKE_TWILIO_LATENCY, keep=1000):
+        self.latency = latency
+        self.messages = _FakeMessages(self)
+        self.sent = deque(maxlen=keep)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _send(self, body, from_, to):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.count += 1
+            message = _FakeMessage(f"SMfake{self.count:08d}", body, from_, to)
+            self.sent.append(message)
+        return message
+
+    def stats(self):
+        with self._lock:
+            return {"sent": self.count}
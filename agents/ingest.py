@@ -0,0 +1,118 @@
+"""
+Offline corpus ingestion for the RAG agents.
+
+Fetches every source concurrently, stores raw HTML/PDF snapshots under their content hash
+and re-embeds only the documents whose hash changed. Serving processes read the resulting
+indexes and never fetch the corpus themselves.
+
+Usage:
+    python -m agents.ingest                      # fetch + sync every collection
+    python -m agents.ingest --collection menopause
+    python -m agents.ingest --offline            # re-sync indexes from existing snapshots
+    python -m agents.ingest --force              # rebuild indexes from scratch
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from agents.corpus import read_snapshot_manifest, write_snapshot_manifest, fetch_snapshot
+from agents.vector_index import sync_index
+
+load_dotenv()
+
+URL_CONFIG_PATH = os.path.join("data", "url.json")
+
+
+def rag_sources():
+    """Return {collection name: [source urls]} for every RAG corpus."""
+    from agents.diet import DIET_LINKS, DIET_COLLECTION_NAME
+
+    try:
+        with open(URL_CONFIG_PATH, "r", encoding="utf-8") as f:
+            url_config = json.load(f)
+    except FileNotFoundError:
+        url_config = {}
+
+    return {
+        DIET_COLLECTION_NAME: list(DIET_LINKS),
+        "menopause": list(url_config.get("menopause", [])),
+    }
+
+
+def fetch_all(urls, workers=8):
+    """Fetch every url concurrently into the snapshot store and return per-url outcomes."""
+    snapshots = read_snapshot_manifest()
+    outcomes = {"changed": [], "unchanged": [], "failed": []}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_snapshot, url, snapshots.get(url)): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                record, changed = future.result()
+            except Exception as e:
+                print(f"   - Failed to fetch {url}: {e}")
+                outcomes["failed"].append(url)
+                continue
+            snapshots[url] = record
+            outcomes["changed" if changed else "unchanged"].append(url)
+
+    write_snapshot_manifest(snapshots)
+    return outcomes
+
+
+def build_embeddings():
+    from agents.diet import EMBEDDING_MODEL_ID
+    from agents.llm_factory import get_embeddings
+
+    return get_embeddings(EMBEDDING_MODEL_ID)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot and index the RAG corpus.")
+    parser.add_argument("--collection", action="append",
+                        help="Only ingest this collection (may be repeated)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Skip fetching and sync indexes from existing snapshots")
+    parser.add_argument("--force", action="store_true",
+                        help="Drop and rebuild the selected indexes")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Concurrent downloads (default: 8)")
+    args = parser.parse_args(argv)
+
+    from agents.diet import EMBEDDING_MODEL_ID, CHUNK_SIZE, CHUNK_OVERLAP
+
+    sources = rag_sources()
+    if args.collection:
+        unknown = set(args.collection) - set(sources)
+        if unknown:
+            parser.error(f"Unknown collection(s): {', '.join(sorted(unknown))}")
+        sources = {name: urls for name, urls in sources.items() if name in args.collection}
+
+    started = time.perf_counter()
+
+    if not args.offline:
+        urls = sorted({url for urls in sources.values() for url in urls})
+        print(f"1. Fetching {len(urls)} sources with {args.workers} workers...")
+        outcomes = fetch_all(urls, workers=args.workers)
+        print(f"   - {len(outcomes['changed'])} changed, {len(outcomes['unchanged'])} unchanged, "
+              f"{len(outcomes['failed'])} failed")
+
+    print("2. Syncing vector indexes...")
+    embeddings = build_embeddings()
+    for name, urls in sources.items():
+        _, stats = sync_index(
+            name, urls, embeddings, EMBEDDING_MODEL_ID,
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, force=args.force
+        )
+        print(f"   - {name}: {stats['embedded']} re-embedded ({stats['chunks']} chunks), "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed, {stats['missing']} missing")
+
+    print(f"\n✅ Ingestion finished in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
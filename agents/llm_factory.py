@@ -0,0 +1,162 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from agents.llm_resilience import BREAKER, ResilientLLM
+from agents.singleflight import LLM_FLIGHTS, CoalescingLLM
+
+load_dotenv()
+
+# --- Shared watsonx.ai clients and named generation profiles ---
+# Every LLM in the app is built here. One APIClient (HTTP session, IAM token) is created
+# per credential set and shared by all profiles, so connections and token refreshes are
+# reused across call sites. Keys match GenTextParamsMetaNames. Each LLM is wrapped with
+# the deadline, retry, hedging and circuit-breaker policy of agents/llm_resilience.py, and
+# identical concurrent calls are coalesced into one by agents/singleflight.py.
+LLM_MODEL_ID = os.getenv("LLM_MODEL_ID", "ibm/granite-3-8b-instruct")
+
+# watsonx | fake, and watsonx | hash: the offline stand-ins live in agents/fakes.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "watsonx")
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "watsonx")
+
+_CHAT_STOPS = ["Human:", "Observation", "Question:", "USER:", "ASSISTANT:",
+               "User previously asked:", "You previously responded:"]
+
+GENERATION_PROFILES = {
+    # LLM fallback of the query classifier: one category name
+    "classifier": {
+        "decoding_method": "greedy",
+        "min_new_tokens": 1,
+        "max_new_tokens": 10,
+        "stop_sequences": ["\n"],
+    },
+    # /batch categorization: one "<number>. <CATEGORY>" line per query
+    "batch_classifier": {
+        "decoding_method": "greedy",
+        "min_new_tokens": 1,
+        "max_new_tokens": 200,
+        "stop_sequences": ["\n\n"],
+    },
+    "basic": {
+        "decoding_method": "greedy",
+        "temperature": 0.3,
+        "min_new_tokens": 10,
+        "max_new_tokens": 150,
+        "stop_sequences": ["Human:", "Observation", "USER QUESTION:", "ASSISTANT:", "User:", "Assistant:"],
+    },
+    "consultation": {
+        "decoding_method": "greedy",
+        "temperature": 0.1,
+        "min_new_tokens": 10,
+        "max_new_tokens": 200,
+        "stop_sequences": _CHAT_STOPS,
+    },
+    "diet": {
+        "decoding_method": "greedy",
+        "temperature": 0.1,
+        "min_new_tokens": 50,
+        "max_new_tokens": 800,
+        "stop_sequences": ["Human:", "USER'S CURRENT QUESTION:"],
+    },
+    "exercise": {
+        "decoding_method": "greedy",
+        "temperature": 0.1,
+        "min_new_tokens": 10,
+        "max_new_tokens": 150,
+        "stop_sequences": _CHAT_STOPS,
+    },
+    # WhatsApp replies from every agent: short enough for one message
+    "whatsapp": {
+        "decoding_method": "greedy",
+        "temperature": 0.1,
+        "min_new_tokens": 10,
+        "max_new_tokens": 200,
+        "stop_sequences": ["Question:", "Human:", "Observation", "USER QUESTION:", "ASSISTANT:", "User:"],
+    },
+    # Background rolling conversation summaries
+    "summarizer": {
+        "decoding_method": "greedy",
+        "min_new_tokens": 10,
+        "max_new_tokens": 120,
+        "stop_sequences": ["Human:", "User:", "NEW EXCHANGES:"],
+    },
+}
+
+_clients = {}
+_llms = {}
+_embeddings = {}
+_lock = threading.Lock()
+
+
+def _credentials():
+    return os.getenv("URL"), os.getenv("API_KEY"), os.getenv("PROJECT_ID")
+
+
+def get_client(url=None, apikey=None, project_id=None):
+    """Return the shared APIClient for a credential set (defaults from the environment)."""
+    default_url, default_apikey, default_project = _credentials()
+    key = (url or default_url, apikey or default_apikey, project_id or default_project)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                from ibm_watsonx_ai import APIClient, Credentials
+
+                client = APIClient(Credentials(url=key[0], api_key=key[1]), project_id=key[2])
+                _clients[key] = client
+    return client
+
+
+def get_llm(profile="basic", model_id=LLM_MODEL_ID):
+    """Return the process-wide (coalesced, resilience-wrapped) WatsonxLLM for a named generation profile."""
+    if profile not in GENERATION_PROFILES:
+        raise ValueError(f"Unknown LLM profile: {profile}")
+    key = (profile, model_id, _credentials())
+    llm = _llms.get(key)
+    if llm is None:
+        params = GENERATION_PROFILES[profile]
+        if LLM_BACKEND == "fake":
+            from agents.fakes import FakeLLM
+
+            base = FakeLLM(profile=profile, min_new_tokens=params["min_new_tokens"],
+                           max_new_tokens=params["max_new_tokens"])
+        else:
+            from langchain_ibm import WatsonxLLM
+
+            base = WatsonxLLM(model_id=model_id, watsonx_client=get_client(), params=dict(params))
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                llm = CoalescingLLM(ResilientLLM(base, profile), profile)
+                _llms[key] = llm
+    return llm
+
+
+def get_embeddings(model_id):
+    """Return the process-wide embeddings client for a model, sharing the watsonx APIClient."""
+    embeddings = _embeddings.get(model_id)
+    if embeddings is None:
+        if EMBEDDINGS_BACKEND == "hash":
+            from agents.fakes import HashEmbeddings
+
+            created = HashEmbeddings()
+        else:
+            from langchain_ibm import WatsonxEmbeddings
+
+            created = WatsonxEmbeddings(model_id=model_id, watsonx_client=get_client())
+        with _lock:
+            embeddings = _embeddings.setdefault(model_id, created)
+    return embeddings
+
+
+def llm_stats():
+    """Per-profile call counters, coalescing counters and the shared circuit breaker state."""
+    return {
+        "backend": LLM_BACKEND,
+        "clients": len(_clients),
+        "breaker": BREAKER.stats(),
+        "singleflight": LLM_FLIGHTS.stats(),
+        "profiles": {profile: llm.stats() for (profile, _, _), llm in list(_llms.items())},
+    }
@@ -0,0 +1,261 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, TimeoutError as FutureTimeout
+
+from agents.stage_timing import STAGE_TIMINGS
+
+# --- Deadlines, retries, hedging and circuit breaking for LLM calls ---
+# Every LLM handed out by agents/llm_factory.py is wrapped in ResilientLLM. A call runs on a
+# shared worker pool so the caller can give up at its deadline; failed attempts are retried
+# with jittered exponential backoff; once enough latencies are known, a duplicate request is
+# sent if the first one is slower than the profile's p95; and a circuit breaker shared by
+# all profiles fails fast while the backend keeps failing.
+LLM_DEADLINES = {
+    "classifier": 5.0,
+    "batch_classifier": 15.0,
+    "basic": 20.0,
+    "consultation": 25.0,
+    "exercise": 20.0,
+    "diet": 45.0,
+    "whatsapp": 20.0,
+    "summarizer": 30.0,
+}
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_CALL_WORKERS = int(os.getenv("LLM_CALL_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_CALL_WORKERS, thread_name_prefix="llm-call")
+_STREAM_END = object()
+
+
+def profile_deadline(profile):
+    """Seconds a call for profile may take in total, overridable with LLM_DEADLINE_<PROFILE>."""
+    default = LLM_DEADLINES.get(profile, 30.0)
+    return float(os.getenv(f"LLM_DEADLINE_{profile.upper()}", str(default)))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised instead of calling the backend while the circuit breaker is open."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when no attempt finished before the profile's deadline."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. Open: calls fail immediately for reset_seconds.
+    Half-open: one probe call is let through; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_seconds=LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"LLM circuit breaker opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+BREAKER = CircuitBreaker()
+
+
+class ResilientLLM:
+    """
+    Wraps a LangChain LLM with the same invoke()/stream() interface. Other attributes
+    (params, model_id, ...) are read from the wrapped LLM, so prompt fingerprints and
+    agents work unchanged.
+    """
+
+    def __init__(self, llm, profile, deadline=None, retries=LLM_RETRIES, hedge=LLM_HEDGE, breaker=BREAKER):
+        self.llm = llm
+        self.profile = profile
+        self.deadline = deadline if deadline is not None else profile_deadline(profile)
+        self.retries = retries
+        self.hedge = hedge
+        self.breaker = breaker
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0}
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined on the wrapper
+        return getattr(self.llm, name)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def hedge_delay(self):
+        """The observed p95 latency, or None until enough calls have been measured."""
+        with self._lock:
+            if not self.hedge or len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return max(LLM_HEDGE_MIN_DELAY, ordered[int(len(ordered) * 0.95) - 1])
+
+    def _timed_invoke(self, prompt, kwargs):
+        started = time.perf_counter()
+        result = self.llm.invoke(prompt, **kwargs)
+        return result, time.perf_counter() - started
+
+    def _attempt(self, prompt, kwargs, ends_at):
+        """One attempt, plus a hedged duplicate if it outlives the p95 latency."""
+        futures = {_executor.submit(self._timed_invoke, prompt, kwargs)}
+        hedge_delay = self.hedge_delay()
+        hedged = None
+        error = None
+        while futures:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"{self.profile} LLM call exceeded {self.deadline:.0f}s")
+            timeout = remaining
+            if hedged is None and hedge_delay is not None:
+                timeout = min(timeout, hedge_delay)
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                with self._lock:
+                    self._latencies.append(seconds)
+                if future is hedged:
+                    self._count("hedge_wins")
+                return result
+            if not done and hedged is None and hedge_delay is not None:
+                hedged = _executor.submit(self._timed_invoke, prompt, kwargs)
+                futures.add(hedged)
+                self._count("hedges")
+        raise error
+
+    def invoke(self, prompt, **kwargs):
+        with STAGE_TIMINGS.time("llm"):
+            return self._invoke(prompt, kwargs)
+
+    def _invoke(self, prompt, kwargs):
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM backend unavailable (circuit open)")
+        self._count("calls")
+        ends_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(prompt, kwargs, ends_at)
+                self.breaker.record_success()
+                return result
+            except LLMTimeoutError:
+                self._count("timeouts")
+                self._count("failures")
+                self.breaker.record_failure()
+                raise
+            except Exception as e:
+                # Full jitter keeps retries from many workers from arriving together
+                backoff = random.uniform(0, LLM_RETRY_BACKOFF * (2 ** attempt))
+                if attempt >= self.retries or time.monotonic() + backoff >= ends_at:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                print(f"{self.profile} LLM call failed ({e}), retrying in {backoff:.2f}s")
+                self._count("retries")
+                attempt += 1
+                time.sleep(backoff)
+
+    def stream(self, prompt, **kwargs):
+        """
+        Stream chunks. Every chunk, the first included, is awaited on the worker pool with
+        the time left until the deadline, so a backend that hangs cannot block the caller;
+        LLMTimeoutError is raised at the deadline even after output started, so a cut-off
+        answer is never mistaken for a complete one. Not retried or hedged.
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM backend unavailable (circuit open)")
+        self._count("calls")
+        ends_at = time.monotonic() + self.deadline
+        chunks = None
+        failed = False
+        try:
+            chunks = iter(self.llm.stream(prompt, **kwargs))
+            started = False
+            while True:
+                remaining = ends_at - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise FutureTimeout()
+                    chunk = _executor.submit(next, chunks, _STREAM_END).result(timeout=remaining)
+                except FutureTimeout:
+                    self._count("timeouts")
+                    # The stuck next() still owns the iterator; it is abandoned, not closed
+                    chunks = None
+                    if not started:
+                        raise LLMTimeoutError(f"{self.profile} LLM stream sent nothing within {self.deadline:.0f}s")
+                    raise LLMTimeoutError(f"{self.profile} LLM stream cut at the {self.deadline:.0f}s deadline")
+                if chunk is _STREAM_END:
+                    return
+                started = True
+                yield chunk
+        except Exception:
+            failed = True
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        finally:
+            # Also reached when the consumer closes the stream early (GeneratorExit), so a
+            # half-open probe is always resolved and the breaker cannot stay stuck
+            if not failed:
+                self.breaker.record_success()
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            stats = dict(self.counters)
+        stats["deadline_seconds"] = self.deadline
+        stats["p95_seconds"] = round(ordered[int(len(ordered) * 0.95) - 1], 3) if ordered else None
+        return stats
@@ -1,137 +1,223 @@
-import os
 import re
-from datetime import datetime
+import time
 from dotenv import load_dotenv
-from langchain_ibm import WatsonxEmbeddings, WatsonxLLM
-from langchain.vectorstores import Chroma
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.prompts import PromptTemplate
-from langchain.tools import tool
-from langchain.tools.render import render_text_description_and_args
-from langchain.agents.output_parsers import JSONAgentOutputParser
-from langchain.agents.format_scratchpad import format_log_to_str
-from langchain.agents import AgentExecutor
-from langchain.memory import ConversationBufferMemory
-from langchain_core.runnables import RunnablePassthrough
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
-from ibm_watsonx_ai.foundation_models.utils.enums import EmbeddingTypes
-import pandas as pd
-
-# Import the agents
-from basic_query import BasicQueryAgent
-from consultation import ConsultationAgent
-from diet import DietAgent
-from exercise import ExerciseAgent
-import json
+from agents.registry import get_agent_registry
+from agents.response_cache import prompt_fingerprint
+from agents.conversation_store import ConversationStore
+from agents.conversation_summary import CONVERSATION_SUMMARY_ENABLED, CONVERSATION_VERBATIM_TOKENS
+from agents.prompt_budget import truncate_to_tokens
+from agents.stage_timing import STAGE_TIMINGS, timed
 load_dotenv()
 
-# --- Centralized Data Loading ---
-try:
-    users_df = pd.read_csv('data/userData.csv').set_index('user_id')
-    symptom_logs_df = pd.read_csv('data/userLogData.csv').set_index('user_id')
-    print("Data files loaded successfully.")
-except FileNotFoundError as e:
-    print(f"FATAL ERROR: {e}. The agent will not have access to user data.")
-    users_df = None
-    symptom_logs_df = None
-
-# --- LLM Initialization ---
-url = os.getenv("URL")
-apikey = os.getenv("API_KEY")
-project_id = os.getenv("PROJECT_ID")
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    apikey=apikey,
-    project_id=project_id,
-    params={
-        GenParams.DECODING_METHOD: "greedy",
-        GenParams.TEMPERATURE: 0.3,  # Lower temperature for more focused responses
-        GenParams.MIN_NEW_TOKENS: 10,
-        GenParams.MAX_NEW_TOKENS: 200,  # Reduced max tokens
-        GenParams.STOP_SEQUENCES: [
-            "Question:", 
-            "\nQuestion:", 
-            "Human:", 
-            "Observation",
-            "USER QUESTION:",
-            "ASSISTANT:",
-            "User:",
-            "Assistant:",
-            "User previously asked:",
-            "You previously responded:"
-        ],
-    },
-)
+class StreamingCleaner:
+    """
+    Incremental counterpart of Orchestrator.clean_response for token streams.
+    Text after a prompt-echo marker ("ASSISTANT:", "User previously asked:", ...) is
+    dropped and the stream is marked stopped; "User: ... Assistant:" and
+    "Question: ... Answer:" spans that start a line are withheld until closed and then
+    discarded (a span that never closes is dropped to the end, as in clean_response).
+    A tail as long as the longest marker is held back so markers split across
+    chunks are still caught. Newline runs are collapsed and the output is stripped.
+    """
+    TRUNCATE_MARKERS = ("user question:", "assistant:", "user previously asked:", "you previously responded:")
+    SPAN_MARKERS = {"user:": "assistant:", "question:": "answer:"}
+    # Span openers only count at the start of a line, so "question:" inside a sentence is kept
+    SPAN_OPENER = re.compile(r"^[ \t]*(user:|question:)", re.IGNORECASE | re.MULTILINE)
+
+    def __init__(self):
+        self.stopped = False
+        self._buffer = ""
+        self._span_closer = None
+        self._pending_whitespace = ""
+        self._started = False
+        self._line_start = True  # whether the buffer starts a line of the emitted text
+        markers = self.TRUNCATE_MARKERS + tuple(self.SPAN_MARKERS)
+        self._hold = max(len(marker) for marker in markers) - 1
+
+    def feed(self, chunk):
+        """Add a chunk of raw model output and return the text that is safe to emit."""
+        if self.stopped:
+            return ""
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def finish(self):
+        """Flush whatever is left once the model stream has ended."""
+        if self.stopped:
+            return ""
+        return self._drain(final=True)
+
+    def _find_marker(self, lower):
+        found_at, found = -1, None
+        for marker in self.TRUNCATE_MARKERS:
+            index = lower.find(marker)
+            if index != -1 and (found is None or index < found_at):
+                found_at, found = index, marker
+        match = self.SPAN_OPENER.search(lower)
+        if match and match.start() == 0 and not self._line_start:
+            # "^" also matches at the buffer start, which may be mid-line
+            match = self.SPAN_OPENER.search(lower, 1)
+        if match and (found is None or match.start(1) < found_at):
+            found_at, found = match.start(1), match.group(1)
+        return found_at, found
+
+    def _emit(self, emitted, text):
+        if text:
+            emitted.append(text)
+            line = text.rsplit("\n", 1)[-1]
+            self._line_start = not line.strip(" \t") and ("\n" in text or self._line_start)
+
+    def _drain(self, final):
+        emitted = []
+        while self._buffer and not self.stopped:
+            lower = self._buffer.lower()
+            if self._span_closer:
+                index = lower.find(self._span_closer)
+                if index == -1:
+                    if final:
+                        self._buffer = ""
+                    break
+                self._buffer = self._buffer[index + len(self._span_closer):]
+                self._span_closer = None
+                continue
+
+            index, marker = self._find_marker(lower)
+            if marker is None:
+                safe = len(self._buffer) if final else max(0, len(self._buffer) - self._hold)
+                self._emit(emitted, self._buffer[:safe])
+                self._buffer = self._buffer[safe:]
+                break
+
+            self._emit(emitted, self._buffer[:index])
+            if marker in self.TRUNCATE_MARKERS:
+                self.stopped = True
+                self._buffer = ""
+                break
+            self._span_closer = self.SPAN_MARKERS[marker]
+            self._buffer = self._buffer[index + len(marker):]
+
+        return self._normalize("".join(emitted), final or self.stopped)
+
+    def _normalize(self, text, final):
+        # Trailing whitespace is held back so newline runs collapse across chunks
+        # and the end of the answer is stripped like clean_response does
+        text = re.sub(r'\n+', '\n', self._pending_whitespace + text)
+        self._pending_whitespace = ""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        stripped = text.rstrip()
+        if not final:
+            self._pending_whitespace = text[len(stripped):]
+        return stripped
+
 
 class Orchestrator:
-    def __init__(self, llm):
-        self.llm = llm
-        # Dictionary to store conversation history for each user
-        self.conversation_history = {}
-        
-        # Initialize all agents
-        self.basic_query_agent = BasicQueryAgent(llm)
-        self.consultation_agent = ConsultationAgent(llm)
-        self.diet_agent = DietAgent(llm)
-        self.exercise_agent = ExerciseAgent(llm)
-
-    def get_conversation_context(self, user_id, max_exchanges=2):
-        """Get recent conversation context for a user"""
-        if user_id not in self.conversation_history:
-            return "No previous conversation history."
+    # Session store namespace for this channel's conversation history
+    CONVERSATION_NAMESPACE = "conversation:web"
+    # Generation profile of the LLM used for query categorization
+    LLM_PROFILE = "classifier"
+    # Generation profile for answers; None keeps each agent's own profile
+    ANSWER_PROFILE = None
+
+    def __init__(self, llm=None, registry=None):
+        # Agents and user data are shared process-wide across channels
+        self.registry = registry or get_agent_registry(llm)
+        self.llm = llm or self.registry.get_llm(self.LLM_PROFILE)
+        self.answer_llm = self.registry.get_llm(self.ANSWER_PROFILE) if self.ANSWER_PROFILE else None
         
-        history = self.conversation_history[user_id]
+        # Bounded per-user ring buffers of recent messages, persisted in the session store
+        self.conversation_history = ConversationStore(
+            session_store=self.registry.session_store, namespace=self.CONVERSATION_NAMESPACE
+        )
+
+    # Agents are built by the registry on first use
+    @property
+    def basic_query_agent(self):
+        return self.registry.basic_query_agent
+
+    @property
+    def consultation_agent(self):
+        return self.registry.consultation_agent
+
+    @property
+    def diet_agent(self):
+        return self.registry.diet_agent
+
+    @property
+    def exercise_agent(self):
+        return self.registry.exercise_agent
+
+    @timed("conversation_context")
+    def get_conversation_context(self, user_id, max_exchanges=1):
+        """
+        Get conversation context for a user: the rolling summary of earlier exchanges
+        plus the most recent exchange(s) verbatim.
+        """
         # Get last N exchanges (each exchange has user query + assistant response)
-        recent_history = history[-(max_exchanges * 2):]
+        recent_history = self.conversation_history.recent(user_id, max_exchanges * 2)
+        summary = self.registry.conversation_summarizer.get(self.CONVERSATION_NAMESPACE, user_id) \
+            if CONVERSATION_SUMMARY_ENABLED else None
         
-        if not recent_history:
+        if not recent_history and not summary:
             return "No previous conversation history."
         
         context_lines = []
+        if summary:
+            context_lines.append(f"Summary of earlier conversation: {summary}")
         for i in range(0, len(recent_history), 2):
             if i + 1 < len(recent_history):
                 user_msg = recent_history[i]
-                assistant_msg = recent_history[i + 1]
+                # Long answers (e.g. diet plans) are cut so the section stays small
+                assistant_msg = truncate_to_tokens(recent_history[i + 1], CONVERSATION_VERBATIM_TOKENS)
                 # Changed format to be less confusing to LLM
                 context_lines.append(f"User previously asked: {user_msg}")
                 context_lines.append(f"You previously responded: {assistant_msg}")
         
         return "\n".join(context_lines)
 
+    @timed("save")
     def save_conversation_exchange(self, user_id, user_query, assistant_response):
         """Save the conversation exchange for this user"""
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
-        
-        # Add the user query and assistant response
-        self.conversation_history[user_id].append(user_query)
-        self.conversation_history[user_id].append(assistant_response)
-        
-        # Keep only last 10 exchanges (20 messages) to prevent memory bloat
-        if len(self.conversation_history[user_id]) > 20:
-            self.conversation_history[user_id] = self.conversation_history[user_id][-20:]
+        if CONVERSATION_SUMMARY_ENABLED:
+            # The previous exchange stops being replayed verbatim; fold it into the summary
+            previous = self.conversation_history.recent(user_id, 2)
+            if len(previous) == 2:
+                self.registry.conversation_summarizer.schedule(
+                    self.CONVERSATION_NAMESPACE, user_id, previous[0], previous[1]
+                )
+        # The store keeps the last CONVERSATION_MAX_MESSAGES messages per user
+        self.conversation_history.append_exchange(user_id, user_query, assistant_response)
 
     def is_first_query(self, user_id):
         """Check if this is the user's first query in this session"""
-        return user_id not in self.conversation_history or len(self.conversation_history[user_id]) == 0
+        return not self.conversation_history.has_history(user_id)
 
     def clean_response(self, response):
         """Clean the response to remove unwanted formatting"""
         # Remove common unwanted patterns
+        cleaned = re.sub(r"USER QUESTION:.*?ASSISTANT:", "", response, flags=re.DOTALL | re.IGNORECASE)
+        
+        # Echoed turns only count at the start of a line, so "question:" inside a sentence
+        # survives. Unclosed echoes run to the end, as StreamingCleaner withholds them, and
+        # the line's indentation is kept as the stream has already sent it.
+        echo_patterns = [
+            r"^([ \t]*)User:.*?Assistant:",
+            r"^([ \t]*)Question:.*?Answer:",
+            r"^([ \t]*)User:.*",
+            r"^([ \t]*)Question:.*"
+        ]
+        for pattern in echo_patterns:
+            cleaned = re.sub(pattern, r"\1", cleaned, flags=re.DOTALL | re.IGNORECASE | re.MULTILINE)
+        
         unwanted_patterns = [
-            r"USER QUESTION:.*?ASSISTANT:",
-            r"User:.*?Assistant:",
-            r"Question:.*?Answer:",
             r"USER QUESTION:.*",
             r"ASSISTANT:.*",
             r"User previously asked:.*",
             r"You previously responded:.*"
         ]
-        
-        cleaned = response
         for pattern in unwanted_patterns:
             cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL | re.IGNORECASE)
         
@@ -141,24 +227,23 @@ class Orchestrator:
         
         return cleaned
 
+    @timed("user_data")
     def get_user_data(self, user_id):
         """Helper method to fetch and consolidate user data."""
-        if users_df is None or symptom_logs_df is None:
-            return None, None
-
-        try:
-            user_profile = users_df.loc[user_id].to_dict()
-        except KeyError:
-            user_profile = None
+        return self.registry.get_user_data(user_id)
 
-        try:
-            user_logs = symptom_logs_df.loc[user_id].to_dict()
-        except KeyError:
-            user_logs = None
+    def get_log_summary(self, user_id):
+        """Precomputed symptom summary for the user's logs."""
+        return self.registry.get_log_summary(user_id)
 
-        print("USER_PROFILE:", user_profile)
-        print("USER_LOGS:", user_logs)
-        return user_profile, user_logs
+    @timed("prompt_context")
+    def get_prompt_context(self, user_id, category, user_profile):
+        """Cached, pre-rendered profile and log blocks for the category's agent prompt."""
+        agent = self.registry.get_agent(category)
+        return {
+            "profile_text": self.registry.prompt_context.profile_text(user_id, user_profile, agent.profile_format),
+            "log_summary": self.get_log_summary(user_id),
+        }
 
     def run_basic_query_agent(self, user_query, user_id):
         """
@@ -171,23 +256,82 @@ class Orchestrator:
         conversation_context = self.get_conversation_context(user_id)
         is_first = self.is_first_query(user_id)
         
+        prompt_context = self.get_prompt_context(user_id, "BASIC_QUERY", user_profile)
+        
         # Pass context to the agent
-        response = self.basic_query_agent.run(
-            user_query=user_query,
-            user_profile=user_profile,
-            user_logs=user_logs,
-            conversation_context=conversation_context,
-            is_first_query=is_first
-        )
+        with STAGE_TIMINGS.time("generate"):
+            response = self.basic_query_agent.run(
+                user_query=user_query,
+                user_profile=user_profile,
+                user_logs=user_logs,
+                conversation_context=conversation_context,
+                is_first_query=is_first,
+                **prompt_context
+            )
+        
+        # Failures come back as a dict with a degraded answer
+        failed = isinstance(response, dict) and bool(response.get('error'))
+        if isinstance(response, dict):
+            response = response['output']
         
         # Clean the response
         response = self.clean_response(response)
         
-        # Save this conversation exchange
-        self.save_conversation_exchange(user_id, user_query, response)
+        # Save this conversation exchange (a degraded answer must not become history)
+        if not failed:
+            self.save_conversation_exchange(user_id, user_query, response)
         
         return response
     
+    def run_unpersonalized(self, category, user_query, clean=False, semantic=False):
+        """
+        Run an agent with no user profile or history. The answer depends only on the
+        query, so repeated questions are served from the shared response cache and,
+        with semantic=True, paraphrases are matched against the semantic cache.
+        """
+        agent = self.registry.get_agent(category)
+        cache = self.registry.response_cache
+        fingerprint = prompt_fingerprint(agent, self.answer_llm)
+        namespace = f"{category}:clean" if clean else category
+        key = cache.make_key(namespace, user_query, fingerprint)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Orchestrator: Response cache hit for {category}.")
+            return cached
+
+        semantic_cache, vector = None, None
+        if semantic:
+            try:
+                semantic_cache = self.registry.semantic_cache
+                answer, similarity, vector = semantic_cache.lookup(user_query, fingerprint=namespace + fingerprint)
+                if answer is not None:
+                    print(f"Orchestrator: Semantic cache hit for {category} (similarity {similarity:.3f}).")
+                    cache.set(key, answer)
+                    return answer
+            except Exception as e:
+                # The cache is an optimization; an embeddings outage must not fail the request
+                print(f"Semantic cache unavailable: {e}")
+                semantic_cache = None
+
+        started = time.perf_counter()
+        result = agent.run(user_query, llm=self.answer_llm)
+        generation_seconds = time.perf_counter() - started
+        STAGE_TIMINGS.record("generate", generation_seconds)
+        if isinstance(result, dict) and 'output' in result:
+            response_text = result['output']
+        else:
+            response_text = str(result)
+        if clean:
+            response_text = self.clean_response(response_text)
+
+        # Canned fallbacks from a failed LLM call must not be served to later callers
+        if not (isinstance(result, dict) and result.get('error')):
+            cache.set(key, response_text)
+            if semantic_cache is not None:
+                semantic_cache.store(user_query, response_text, generation_seconds,
+                                     vector=vector, fingerprint=namespace + fingerprint)
+        return response_text
+
     def _categorize_query(self, query):
         """Internal method for LLM-based categorization."""
         prompt = f"""You are an intelligent query categorization system for a menopause health and wellness assistant. 
@@ -204,71 +348,155 @@ class Orchestrator:
         User Query: "What are the symptoms of menopause?"
         Response: BASIC_QUERY 
         
-        Based on the content and context of this query, respond with ONLY the category name (BASIC_QUERY, CONSULTATION, DIET, or EXERCISE)."""
+        Based on the content and context of this query, respond with ONLY the category name (BASIC_QUERY, CONSULTATION, DIET, or EXERCISE).
+
+        Category:"""
         response = self.llm.invoke(prompt)
         return response.strip().upper()
 
-    def run_categorization_pipeline(self, query, user_id):
+    @timed("categorize")
+    def resolve_category(self, query):
         """
-        Main pipeline that categorizes first, then routes.
+        Categorize a query. The local classifier answers confident cases in-process;
+        only ambiguous queries pay for the LLM categorization round-trip.
         """
-        raw_category_response = self._categorize_query(query)
+        category, confidence = self.registry.classifier.classify(query)
+        if self.registry.classifier.is_confident(confidence):
+            print(f"Orchestrator: Local classifier chose '{category}' (confidence {confidence:.2f}).")
+            return category
+
+        try:
+            raw_category_response = self._categorize_query(query)
+        except Exception as e:
+            # Timeout or open circuit: the local classifier's best guess is good enough
+            print(f"LLM categorization unavailable ({e}); using '{category}'.")
+            return category
         print("########", raw_category_response, "########")
-        final_category = "BASIC_QUERY"
+        # An empty or unrecognized answer keeps the local classifier's guess
+        final_category = category
         if "CONSULTATION" in raw_category_response: final_category = "CONSULTATION"
         elif "DIET" in raw_category_response: final_category = "DIET"
         elif "EXERCISE" in raw_category_response: final_category = "EXERCISE"
-        
-        print(f"Orchestrator: Categorized as '{final_category}'. Routing...")
-        
-        user_profile, user_logs = self.get_user_data(user_id)
-        conversation_context = self.get_conversation_context(user_id)
-        is_first = self.is_first_query(user_id)
+        elif "BASIC" in raw_category_response: final_category = "BASIC_QUERY"
+        return final_category
 
-        # Route to the correct agent with context
-        if final_category == "DIET":
-            response = self.diet_agent.run(
-                user_query=query, 
-                user_profile=user_profile, 
-                user_logs=user_logs,
-                conversation_context=conversation_context,
-                is_first_query=is_first
-            )
-        elif final_category == "EXERCISE":
-            response = self.exercise_agent.run(
-                user_query=query, 
-                user_profile=user_profile, 
-                user_logs=user_logs,
-                conversation_context=conversation_context,
-                is_first_query=is_first
-            )
-        elif final_category == "CONSULTATION":
-            response = self.consultation_agent.run(
-                user_query=query, 
-                user_profile=user_profile, 
-                user_logs=user_logs,
-                conversation_context=conversation_context,
-                is_first_query=is_first
-            )
-        else: # BASIC_QUERY
-            response = self.basic_query_agent.run(
-                user_query=query, 
-                user_profile=user_profile, 
-                user_logs=user_logs,
-                conversation_context=conversation_context,
-                is_first_query=is_first
-            )
+    @timed("generate")
+    def route_to_agent(self, category, user_query, user_profile, user_logs, conversation_context, is_first,
+                       log_summary=None, profile_text=None):
+        """
+        Run the agent for category. Returns (cleaned response text, failed), where failed
+        marks the degraded answer an agent gives when its LLM call did not succeed.
+        """
+        agent = self.registry.get_agent(category)
+        response = agent.run(
+            user_query=user_query, 
+            user_profile=user_profile, 
+            user_logs=user_logs,
+            conversation_context=conversation_context,
+            is_first_query=is_first,
+            log_summary=log_summary,
+            profile_text=profile_text,
+            llm=self.answer_llm
+        )
         
         # Extract response text from agent output
+        failed = isinstance(response, dict) and bool(response.get('error'))
         if isinstance(response, dict) and 'output' in response:
             response_text = response['output']
         else:
             response_text = str(response)
         
         # Clean the response to remove unwanted formatting
-        response_text = self.clean_response(response_text)
-        
-        # Save this conversation exchange
+        return self.clean_response(response_text), failed
+
+    def stream_categorization_pipeline(self, query, user_id):
+        """
+        Streaming variant of run_categorization_pipeline. Yields (event, data) tuples:
+        ("category", name) first, then ("token", text) as the model generates, and
+        finally ("done", text) with the fully cleaned answer that is saved to history.
+        If the model fails or hits its deadline, ("error", message) replaces "done" and
+        nothing is saved.
+        Agent-specific post-processing (e.g. the consultation disclaimer filter) is only
+        reflected in the final "done" text.
+        """
+        final_category = self.resolve_category(query)
+        print(f"Orchestrator: Categorized as '{final_category}'. Streaming...")
+        yield "category", final_category
+
+        user_profile, user_logs = self.get_user_data(user_id)
+        conversation_context = self.get_conversation_context(user_id)
+        is_first = self.is_first_query(user_id)
+
+        agent = self.registry.get_agent(final_category)
+        prompt = agent.build_prompt(query, user_profile, user_logs, conversation_context, is_first,
+                                    **self.get_prompt_context(user_id, final_category, user_profile))
+
+        cleaner = StreamingCleaner()
+        raw_chunks = []
+        # Only time spent waiting on the model counts as "generate", not the time this
+        # generator is suspended while the client reads (or abandons) a token
+        generating = 0.0
+        chunks = None
+        try:
+            chunks = iter((self.answer_llm or agent.llm).stream(prompt))
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                generating += time.perf_counter() - started
+                if chunk is None:
+                    break
+                raw_chunks.append(chunk)
+                text = cleaner.feed(chunk)
+                if text:
+                    yield "token", text
+                if cleaner.stopped:
+                    # Everything after a prompt-echo marker is discarded, stop generating
+                    break
+        except Exception as e:
+            # Timeout, open breaker or a dropped backend: the partial answer is not saved
+            print(f"Orchestrator: streaming failed ({e}), the exchange is not saved.")
+            yield "error", "I'm sorry, I'm having trouble answering right now. Please try again in a moment."
+            return
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            STAGE_TIMINGS.record("generate", generating)
+        tail = cleaner.finish()
+        if tail:
+            yield "token", tail
+
+        response_text = self.clean_response(agent.postprocess("".join(raw_chunks), query))
         self.save_conversation_exchange(user_id, query, response_text)
+        yield "done", response_text
+
+    def run_categorization_pipeline(self, query, user_id):
+        """
+        Main pipeline that categorizes first, then routes.
+        """
+        final_category = self.resolve_category(query)
+        print(f"Orchestrator: Categorized as '{final_category}'. Routing...")
+        response_text, _ = self.answer_query(final_category, query, user_id)
+        return response_text
+
+    def answer_query(self, category, query, user_id):
+        """
+        Answer an already categorized query with the user's context and record the exchange.
+        Returns (response_text, failed); failed is True for a degraded answer (LLM timeout or
+        open circuit breaker), which is not recorded.
+        """
+        user_profile, user_logs = self.get_user_data(user_id)
+        conversation_context = self.get_conversation_context(user_id)
+        is_first = self.is_first_query(user_id)
+
+        # Route to the correct agent with context
+        response_text, failed = self.route_to_agent(
+            category, query, user_profile, user_logs, conversation_context, is_first,
+            **self.get_prompt_context(user_id, category, user_profile)
+        )
+        
+        # Save this conversation exchange (a degraded answer must not become history)
+        if not failed:
+            self.save_conversation_exchange(user_id, query, response_text)
         
-        return response_text
\ No newline at end of file
+        return response_text, failed
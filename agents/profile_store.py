@@ -0,0 +1,150 @@
+import os
+import csv
+import sys
+import time
+import threading
+
+from agents.symptom_logs import SYMPTOM_LOG_CACHE, SYMPTOM_LOG_JOURNAL, SymptomLogStore
+from agents.symptom_summary import SymptomSummaryCache
+
+# --- Indexed user profile and symptom log store ---
+# Profiles are read once into a dict of user_id -> tuple record, with the column names held
+# once and repeated values interned, so a lookup is a single dict access. Symptom logs live
+# in a pre-parsed columnar table (agents/symptom_logs.py). Both are re-read when their
+# file's modification time changes; symptoms logged at runtime go through the log journal
+# and only refresh the affected users' summaries.
+USER_DATA_PATH = os.getenv("USER_DATA_PATH", os.path.join("data", "userData.csv"))
+USER_LOG_DATA_PATH = os.getenv("USER_LOG_DATA_PATH", os.path.join("data", "userLogData.csv"))
+PROFILE_RELOAD_INTERVAL = float(os.getenv("PROFILE_RELOAD_INTERVAL", "5"))
+
+
+def _compact(value):
+    # Empty cells become None, repeated strings share one object
+    if value is None or value == "":
+        return None
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class RecordTable:
+    """Compact user_id -> record mapping loaded from one CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = ()
+        self.records = {}
+        self.mtime = None
+
+    def load(self):
+        """Read the CSV. Empty cells become None; returns False when the file is missing."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                records = {}
+                for row in reader:
+                    if not row:
+                        continue
+                    values = tuple(_compact(value) for value in row[1:])
+                    records[row[0]] = values
+        except FileNotFoundError:
+            return False
+        self.columns = tuple(header[1:])
+        self.records = records
+        self.mtime = mtime
+        return True
+
+    def changed(self):
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except FileNotFoundError:
+            return False
+
+    def get(self, user_id):
+        record = self.records.get(user_id)
+        if record is None:
+            return None
+        return dict(zip(self.columns, record))
+
+
+class ProfileStore:
+    """
+    Process-wide profile and symptom log lookups.
+    `generation` increases whenever either file is reloaded and each user's counter
+    increases when entries are logged for them; version(user_id) combines both so derived
+    per-user data (rendered prompt blocks) can be invalidated by comparing it.
+    """
+
+    def __init__(self, users_path=USER_DATA_PATH, logs_path=USER_LOG_DATA_PATH,
+                 reload_interval=PROFILE_RELOAD_INTERVAL, log_cache_path=SYMPTOM_LOG_CACHE,
+                 log_journal_path=SYMPTOM_LOG_JOURNAL):
+        self.users = RecordTable(users_path)
+        self.logs = SymptomLogStore(logs_path, log_cache_path, log_journal_path)
+        self.summaries = SymptomSummaryCache()
+        self.reload_interval = reload_interval
+        self.generation = 0
+        self.user_versions = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        with self._lock:
+            users_ok = self.users.load()
+            logs_ok = self.logs.load()
+            summaries = SymptomSummaryCache()
+            summaries.build(self.logs.table)
+            self.summaries = summaries
+            self.user_versions = {}
+            self.generation += 1
+            self._checked_at = time.monotonic()
+        if users_ok and logs_ok:
+            print(f"Data files loaded successfully ({len(self.users.records)} users).")
+        else:
+            print("FATAL ERROR: user data files not found. The agent will not have access to user data.")
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        if self.users.changed() or self.logs.changed():
+            self.load()
+        elif self.logs.journal_changed():
+            # Entries logged by other workers
+            with self._lock:
+                self._refresh_users(self.logs.refresh())
+
+    def _refresh_users(self, user_ids):
+        table = self.logs.table
+        for user_id in user_ids:
+            self.summaries.update_user(table, user_id)
+            self.user_versions[user_id] = self.user_versions.get(user_id, 0) + 1
+
+    def get_user_data(self, user_id):
+        """Return (profile, logs) dicts for user_id; either is None when unknown."""
+        self._reload_if_changed()
+        return self.users.get(user_id), self.logs.get(user_id)
+
+    def get_log_summary(self, user_id):
+        """Precomputed symptom summary text for user_id, or None when they have no logs."""
+        self._reload_if_changed()
+        summary = self.summaries.get(user_id)
+        return summary["text"] if summary else None
+
+    def log_symptoms(self, user_id, entries):
+        """Record new (symptom, iso_date, intensity) entries and refresh only the affected summaries."""
+        with self._lock:
+            self._refresh_users(self.logs.append(user_id, entries))
+
+    def version(self, user_id):
+        """Opaque value that changes whenever user_id's profile or logs change."""
+        self._reload_if_changed()
+        return self.generation, self.user_versions.get(user_id, 0)
+
+    def stats(self):
+        return {
+            "users": len(self.users.records),
+            "log_rows": len(self.logs.table.dates) if self.logs.table is not None else 0,
+            "generation": self.generation,
+        }
@@ -0,0 +1,145 @@
+import os
+import threading
+
+# --- Token-budgeted prompt assembly ---
+# Prompts are measured with the same tiktoken encoding the corpus splitter uses. Each agent
+# names the variable sections of its template with a priority; when the rendered prompt
+# would exceed the agent's input budget, the lowest-priority sections are shortened first
+# (whole lines at a time) until it fits. The question and instructions are never trimmed.
+PROMPT_TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "gpt2")
+CHARS_PER_TOKEN = 4  # estimate used when the tiktoken vocabulary cannot be loaded
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    import tiktoken
+
+                    _encoder = tiktoken.get_encoding(PROMPT_TOKEN_ENCODING)
+                except Exception as e:
+                    # tiktoken downloads its vocabulary on first use; budgets still apply offline
+                    print(f"Token counter unavailable, estimating from characters: {e}")
+                    _encoder = False
+    return _encoder
+
+
+def count_tokens(text):
+    encoder = _get_encoder()
+    if not text:
+        return 0
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens, keep="head"):
+    """
+    Shorten text to at most max_tokens, dropping whole lines from the end (keep="head")
+    or from the start (keep="tail", for oldest-first histories).
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.split("\n")
+    if keep == "tail":
+        lines.reverse()
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + (1 if kept else 0)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        # A single line longer than the budget: cut it by characters
+        line = lines[0]
+        low, high = 0, len(line)
+        while low < high:
+            mid = (low + high + 1) // 2
+            piece = line[:mid] if keep == "head" else line[-mid:]
+            if count_tokens(piece) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return line[:low] if keep == "head" else line[len(line) - low:]
+    if keep == "tail":
+        kept.reverse()
+    return "\n".join(kept)
+
+
+class PromptSection:
+    """A trimmable template field. Higher priority sections keep their tokens longer."""
+
+    def __init__(self, name, text, priority, keep="head"):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.keep = keep
+
+
+class PromptTokenStats:
+    """Per-agent prompt size counters shown on /health."""
+
+    def __init__(self):
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_name, report):
+        with self._lock:
+            stats = self._agents.setdefault(
+                agent_name, {"prompts": 0, "total_tokens": 0, "max_tokens": 0, "trimmed": 0}
+            )
+            stats["prompts"] += 1
+            stats["total_tokens"] += report["prompt_tokens"]
+            stats["max_tokens"] = max(stats["max_tokens"], report["prompt_tokens"])
+            if report["trimmed"]:
+                stats["trimmed"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: dict(stats, avg_tokens=round(stats["total_tokens"] / stats["prompts"], 1))
+                for name, stats in self._agents.items()
+            }
+
+
+PROMPT_STATS = PromptTokenStats()
+
+
+def assemble_prompt(template, budget, sections, agent_name, **fixed):
+    """
+    Format template with the fixed fields and the sections, trimming sections so the
+    prompt stays within budget tokens. Returns (prompt, report) where report holds
+    prompt_tokens, budget and the tokens removed per section.
+    """
+    empty = {section.name: "" for section in sections}
+    base_tokens = count_tokens(template.format(**fixed, **empty))
+    remaining = budget - base_tokens
+
+    # Give tokens to the most important sections first; a section placed twice costs twice
+    values, trimmed = {}, {}
+    for section in sorted(sections, key=lambda s: s.priority, reverse=True):
+        occurrences = max(1, template.count("{" + section.name + "}"))
+        tokens = count_tokens(section.text)
+        allowance = max(0, remaining // occurrences)
+        text = section.text
+        if tokens > allowance:
+            text = truncate_to_tokens(section.text, allowance, keep=section.keep)
+            trimmed[section.name] = tokens - count_tokens(text)
+            tokens = count_tokens(text)
+        values[section.name] = text
+        remaining -= tokens * occurrences
+
+    prompt = template.format(**fixed, **values)
+    report = {"prompt_tokens": count_tokens(prompt), "budget": budget, "trimmed": trimmed}
+    PROMPT_STATS.record(agent_name, report)
+    print(f"{agent_name}: prompt {report['prompt_tokens']} tokens (budget {budget})"
+          + (f", trimmed {trimmed}" if trimmed else ""))
+    return prompt, report
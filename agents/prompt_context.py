@@ -0,0 +1,92 @@
+import os
+import math
+import threading
+from datetime import date
+from collections import OrderedDict
+
+# --- Rendered prompt context per user ---
+# The profile block in each agent's prompt only changes when the profile changes (or, for
+# the age line, when the date changes), so it is rendered once per user and format and
+# reused until the profile store reports a new version for that user.
+PROMPT_CONTEXT_CACHE_SIZE = int(os.getenv("PROMPT_CONTEXT_CACHE_SIZE", "10000"))
+
+
+def _present(value):
+    return value is not None and value != "" and not (isinstance(value, float) and math.isnan(value))
+
+
+def age_from_dob(dob, today=None):
+    """Whole years since an ISO date of birth, or None when it cannot be parsed."""
+    try:
+        born = date.fromisoformat(str(dob))
+    except ValueError:
+        return None
+    today = today or date.today()
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+def render_profile_details(profile, today=None):
+    """Bullet list used by the basic query prompt, with the age derived from dob."""
+    if not profile:
+        return "No user profile available."
+    fields = {key: value for key, value in profile.items() if _present(value)}
+    age = age_from_dob(fields.get("dob"), today)
+    fields["age"] = age if age is not None else "unknown"
+    return "\n".join(f"- {key.replace('_', ' ').title()}: {value}" for key, value in fields.items())
+
+
+def render_profile_repr(profile):
+    """Dict-style profile text used by the consultation, diet and exercise prompts."""
+    fields = {key: value for key, value in (profile or {}).items() if _present(value)}
+    return str(fields) if fields else "No user profile available"
+
+
+PROFILE_RENDERERS = {
+    "details": render_profile_details,
+    "repr": render_profile_repr,
+}
+
+
+class PromptContextCache:
+    """
+    LRU of (user_id, format) -> rendered profile text, validated against the profile
+    store's per-user version and today's date. Returned strings are never mutated, so
+    the caller's profile dict is left untouched.
+    """
+
+    def __init__(self, profile_store, max_entries=PROMPT_CONTEXT_CACHE_SIZE):
+        self.profile_store = profile_store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (user_id, format) -> (version, text)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def profile_text(self, user_id, profile, profile_format):
+        version = (self.profile_store.version(user_id), date.today().toordinal())
+        key = (user_id, profile_format)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        text = PROFILE_RENDERERS[profile_format](profile)
+        with self._lock:
+            self._entries[key] = (version, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,183 @@
+import threading
+import importlib
+
+from agents.classifier import QueryClassifier
+from agents.response_cache import ResponseCache
+from agents.prompt_budget import PROMPT_STATS
+
+# category -> (module, class, LLM profile). Agent modules and their heavy dependencies
+# (LangChain, Chroma, embeddings) are only imported when the category is first used.
+AGENT_CLASSES = {
+    "BASIC_QUERY": ("agents.basic_query", "BasicQueryAgent", "basic"),
+    "CONSULTATION": ("agents.consultation", "ConsultationAgent", "consultation"),
+    "DIET": ("agents.diet", "DietAgent", "diet"),
+    "EXERCISE": ("agents.exercise", "ExerciseAgent", "exercise"),
+}
+
+
+class AgentRegistry:
+    """
+    Process-wide agents and user data shared by every channel.
+    The web Orchestrator and the whatsappOrchestrator both route through one
+    registry, so the corpus is indexed and the CSVs are loaded only once.
+    Agents are constructed on the first request for their category.
+    """
+
+    def __init__(self, llm=None):
+        # When an llm is given every component uses it; otherwise each gets its
+        # generation profile from agents.llm_factory
+        self.llm = llm
+        self.classifier = QueryClassifier()
+        self.response_cache = ResponseCache()
+        self.agents = {}
+        self._profile_store = None
+        self._prompt_context = None
+        self._summarizer = None
+        self._embeddings = None
+        self._semantic_cache = None
+        self._session_store = None
+        self._lock = threading.Lock()
+
+    def get_agent(self, category):
+        """Return the agent for a category, falling back to the basic query agent."""
+        if category not in AGENT_CLASSES:
+            category = "BASIC_QUERY"
+        agent = self.agents.get(category)
+        if agent is None:
+            with self._lock:
+                agent = self.agents.get(category)
+                if agent is None:
+                    module_name, class_name, profile = AGENT_CLASSES[category]
+                    agent_class = getattr(importlib.import_module(module_name), class_name)
+                    agent = agent_class(self.get_llm(profile))
+                    self.agents[category] = agent
+        return agent
+
+    def get_llm(self, profile):
+        """LLM for a named generation profile, sharing one watsonx client per credential set."""
+        if self.llm is not None:
+            return self.llm
+        from agents.llm_factory import get_llm
+
+        return get_llm(profile)
+
+    @property
+    def basic_query_agent(self):
+        return self.get_agent("BASIC_QUERY")
+
+    @property
+    def consultation_agent(self):
+        return self.get_agent("CONSULTATION")
+
+    @property
+    def diet_agent(self):
+        return self.get_agent("DIET")
+
+    @property
+    def exercise_agent(self):
+        return self.get_agent("EXERCISE")
+
+    @property
+    def embeddings(self):
+        """Shared query embeddings client, created on first use."""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from agents.diet import EMBEDDING_MODEL_ID
+                    from agents.llm_factory import get_embeddings
+
+                    self._embeddings = get_embeddings(EMBEDDING_MODEL_ID)
+        return self._embeddings
+
+    @property
+    def semantic_cache(self):
+        """Nearest-question answer cache for paraphrased general questions."""
+        if self._semantic_cache is None:
+            from agents.semantic_cache import SemanticCache
+
+            embeddings = self.embeddings
+            with self._lock:
+                if self._semantic_cache is None:
+                    self._semantic_cache = SemanticCache(embeddings.embed_query)
+        return self._semantic_cache
+
+    @property
+    def session_store(self):
+        """Durable session state (conversation history, WhatsApp state) shared by worker processes."""
+        if self._session_store is None:
+            with self._lock:
+                if self._session_store is None:
+                    from agents.session_store import create_session_store
+
+                    self._session_store = create_session_store()
+        return self._session_store
+
+    @property
+    def conversation_summarizer(self):
+        """Background folding of older exchanges into rolling per-user summaries."""
+        if self._summarizer is None:
+            session_store = self.session_store
+            with self._lock:
+                if self._summarizer is None:
+                    from agents.conversation_summary import ConversationSummarizer
+
+                    self._summarizer = ConversationSummarizer(self.get_llm("summarizer"), session_store)
+        return self._summarizer
+
+    def cache_stats(self):
+        """Hit/miss counters for the answer caches (the semantic cache only once used)."""
+        return {
+            "response_cache": self.response_cache.stats(),
+            "semantic_cache": self._semantic_cache.stats() if self._semantic_cache else None,
+            "prompt_context": self._prompt_context.stats() if self._prompt_context else None,
+            "prompt_tokens": PROMPT_STATS.stats(),
+            "conversation_summary": self._summarizer.stats() if self._summarizer else None,
+        }
+
+    @property
+    def profile_store(self):
+        """Indexed user profiles and symptom logs, loaded on first use."""
+        if self._profile_store is None:
+            with self._lock:
+                if self._profile_store is None:
+                    from agents.profile_store import ProfileStore
+
+                    self._profile_store = ProfileStore()
+        return self._profile_store
+
+    @property
+    def prompt_context(self):
+        """Per-user rendered profile blocks, invalidated by the profile store's versions."""
+        if self._prompt_context is None:
+            profile_store = self.profile_store
+            with self._lock:
+                if self._prompt_context is None:
+                    from agents.prompt_context import PromptContextCache
+
+                    self._prompt_context = PromptContextCache(profile_store)
+        return self._prompt_context
+
+    def get_user_data(self, user_id):
+        """Fetch the profile and symptom logs for a user."""
+        return self.profile_store.get_user_data(user_id)
+
+    def get_log_summary(self, user_id):
+        """Precomputed symptom summary text for a user, or None."""
+        return self.profile_store.get_log_summary(user_id)
+
+    def log_symptoms(self, user_id, entries):
+        """Record (symptom, iso_date, intensity) entries; only this user's summary is refreshed."""
+        self.profile_store.log_symptoms(user_id, entries)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry(llm=None):
+    """Return the process-wide registry, creating it on first use (llm overrides all profiles)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AgentRegistry(llm)
+    return _registry
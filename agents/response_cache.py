@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Exact-match cache for non-personalized answers ---
+# Answers produced without a user profile depend only on the agent, the query and the
+# prompt/generation settings, so they can be served again without calling the LLM.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")  # unset = memory only
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Fold case, punctuation and whitespace so trivially different spellings share an entry."""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def prompt_fingerprint(agent, llm=None):
+    """
+    Hash of an agent's prompt template and generation params (of llm when it replaces the
+    agent's own); changes invalidate its entries.
+    """
+    template = getattr(agent, "prompt_template", "")
+    params = getattr(llm or getattr(agent, "llm", None), "params", None)
+    payload = template + json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache with optional JSON persistence and hit/miss counters."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL,
+                 persist_path=RESPONSE_CACHE_PATH, persist_every=50):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.persist_every = persist_every
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._writes_since_save = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def make_key(self, namespace, query, fingerprint):
+        return f"{namespace}|{fingerprint}|{normalize_query(query)}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            # Wall-clock expiry so persisted entries keep their age across restarts
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._writes_since_save += 1
+            should_save = self.persist_path and self._writes_since_save >= self.persist_every
+        if should_save:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, value) in stored.items():
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        print(f"Response cache: loaded {len(self._entries)} entries from {self.persist_path}")
+
+    def save(self):
+        if not self.persist_path:
+            return
+        with self._lock:
+            snapshot = {key: list(entry) for key, entry in self._entries.items()}
+            self._writes_since_save = 0
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.persist_path)
@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --- Semantic cache for paraphrased general questions ---
+# Unpersonalized questions are embedded and compared against previously answered ones with
+# cosine similarity over an in-memory matrix. A match above the threshold returns the stored
+# answer instead of generating a new one.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "500"))
+
+
+class SemanticCache:
+    """Size-bounded nearest-neighbour answer cache with LRU eviction."""
+
+    def __init__(self, embed_query, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE):
+        self.embed_query = embed_query
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors = None           # (max_entries, dim) unit vectors, allocated on first store
+        self._entries = {}             # slot -> {"question", "answer", "generation_seconds"}
+        self._lru = OrderedDict()      # slot -> None, least recently used first
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latency_saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def embed(self, query):
+        """Return the unit-length embedding for query."""
+        vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query, fingerprint=None):
+        """
+        Return (answer, similarity, vector). answer is None on a miss; the vector is
+        returned so a subsequent store() does not embed the query twice.
+        """
+        started = time.perf_counter()
+        vector = self.embed(query)
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                # Prompt or generation settings changed, earlier answers no longer apply
+                self._clear_locked()
+                self._fingerprint = fingerprint
+            best_slot, similarity = None, 0.0
+            if self._entries:
+                slots = np.fromiter(self._entries.keys(), dtype=np.int64)
+                similarities = self._vectors[slots] @ vector
+                best = int(np.argmax(similarities))
+                best_slot, similarity = int(slots[best]), float(similarities[best])
+
+            self.lookup_seconds += time.perf_counter() - started
+            if best_slot is None or similarity < self.threshold:
+                self.misses += 1
+                return None, similarity, vector
+            entry = self._entries[best_slot]
+            self._lru.move_to_end(best_slot)
+            self.hits += 1
+            self.latency_saved_seconds += entry["generation_seconds"]
+            return entry["answer"], similarity, vector
+
+    def store(self, query, answer, generation_seconds, vector=None, fingerprint=None):
+        if vector is None:
+            vector = self.embed(query)
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._clear_locked()
+                self._fingerprint = fingerprint
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if len(self._entries) < self.max_entries:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                "question": query,
+                "answer": answer,
+                "generation_seconds": generation_seconds,
+            }
+            self._lru[slot] = None
+            self._lru.move_to_end(slot)
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+                "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- Durable session state shared by worker processes ---
+# Conversation history and WhatsApp conversation state are kept in a pluggable backend
+# (SQLite by default). Writes go to an in-memory pending batch that a background thread
+# flushes in one transaction, so the request path never waits on disk; reads go through a
+# small cache whose short TTL bounds how stale another worker's writes can look.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")  # sqlite | memory
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("data", "sessions.db"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "2"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.5"))
+
+
+class MemoryBackend:
+    """Process-local backend; state is lost on restart and not shared between workers."""
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            return self._rows.get((namespace, key))
+
+    def put_many(self, items):
+        """items: list of ((namespace, key), value); a value of None deletes the row."""
+        with self._lock:
+            for row_key, value in items:
+                if value is None:
+                    self._rows.pop(row_key, None)
+                else:
+                    self._rows[row_key] = value
+
+
+class SqliteBackend:
+    """SQLite table of JSON values keyed on (namespace, key), in WAL mode for concurrent workers."""
+
+    def __init__(self, path=SESSION_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._connection().execute(
+            "SELECT value FROM sessions WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, items):
+        """items: list of ((namespace, key), value); a value of None deletes the row."""
+        now = time.time()
+        upserts = [(ns, key, json.dumps(value), now) for (ns, key), value in items if value is not None]
+        deletes = [(ns, key) for (ns, key), value in items if value is None]
+        with self._connection() as conn:
+            if upserts:
+                conn.executemany(
+                    "INSERT INTO sessions (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, "
+                    "updated_at = excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                conn.executemany("DELETE FROM sessions WHERE namespace = ? AND key = ?", deletes)
+
+
+class SessionStore:
+    """
+    Write-behind, read-through front for a session backend.
+    Values must be JSON-serializable. Callers get copies, so mutating a returned value
+    has no effect until it is passed back to put().
+    """
+
+    def __init__(self, backend, cache_ttl=SESSION_CACHE_TTL, cache_size=SESSION_CACHE_SIZE,
+                 flush_interval=SESSION_FLUSH_INTERVAL):
+        self.backend = backend
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self._cache = OrderedDict()   # (namespace, key) -> (loaded_at, json text)
+        self._pending = {}            # (namespace, key) -> value awaiting flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+
+        thread = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def get(self, namespace, key, default=None):
+        row_key = (namespace, key)
+        now = time.monotonic()
+        with self._lock:
+            if row_key in self._pending:
+                # Our own unflushed write is the newest value
+                self.hits += 1
+                value = self._pending[row_key]
+                return default if value is None else json.loads(json.dumps(value))
+            entry = self._cache.get(row_key)
+            if entry is not None and now - entry[0] <= self.cache_ttl:
+                self._cache.move_to_end(row_key)
+                self.hits += 1
+                return default if entry[1] is None else json.loads(entry[1])
+            self.misses += 1
+
+        value = self.backend.get(namespace, key)
+        text = None if value is None else json.dumps(value)
+        with self._lock:
+            if row_key not in self._pending:
+                self._remember(row_key, now, text)
+        return default if value is None else value
+
+    def put(self, namespace, key, value):
+        """Store value (None deletes); it reaches the backend on the next flush."""
+        row_key = (namespace, key)
+        text = None if value is None else json.dumps(value)
+        with self._lock:
+            self._pending[row_key] = None if text is None else json.loads(text)
+            self._remember(row_key, time.monotonic(), text)
+        self._wakeup.set()
+
+    def delete(self, namespace, key):
+        self.put(namespace, key, None)
+
+    def _remember(self, row_key, loaded_at, text):
+        self._cache[row_key] = (loaded_at, text)
+        self._cache.move_to_end(row_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def flush(self):
+        """Write all pending values to the backend in one batch."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                self.backend.put_many(list(batch.items()))
+            except Exception as e:
+                print(f"Session store flush failed: {e}")
+                with self._lock:
+                    self.flush_errors += 1
+                    # Re-queue unless a newer write for the same key arrived meanwhile
+                    for row_key, value in batch.items():
+                        self._pending.setdefault(row_key, value)
+                return
+            with self._lock:
+                self.flushes += 1
+                self.flushed_rows += len(batch)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            # Let writes from the same burst join this batch
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "cached": len(self._cache),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+                "flush_errors": self.flush_errors,
+            }
+
+
+def create_session_store(backend=SESSION_BACKEND, path=SESSION_DB_PATH):
+    """Build the session store selected by SESSION_BACKEND."""
+    if backend == "memory":
+        return SessionStore(MemoryBackend())
+    if backend == "sqlite":
+        return SessionStore(SqliteBackend(path))
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,96 @@
+import json
+import hashlib
+import threading
+
+# --- Single-flight coalescing of identical LLM calls ---
+# When many users send the same question at once (e.g. after a newsletter), the classifier
+# and unpersonalized prompts are byte-identical. Concurrent calls with the same generation
+# profile and prompt hash share one in-flight generation: the first caller runs it, the
+# others wait for and receive the same result (or exception).
+
+
+def flight_key(profile, model_id, prompt, kwargs):
+    """Stable key for one generation: profile, model, prompt hash and call options."""
+    payload = json.dumps([profile, model_id, prompt, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; duplicates arriving meanwhile share it."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._profiles = {}  # profile -> {"calls", "executions", "coalesced"}
+
+    def _count(self, profile, coalesced):
+        stats = self._profiles.setdefault(profile, {"calls": 0, "executions": 0, "coalesced": 0})
+        stats["calls"] += 1
+        stats["coalesced" if coalesced else "executions"] += 1
+
+    def do(self, key, fn, profile="default"):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+            self._count(profile, coalesced=not leader)
+
+        if not leader:
+            # The leader's call is bounded by its own deadline, so this wait is too
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "profiles": {name: dict(stats) for name, stats in self._profiles.items()},
+            }
+
+
+LLM_FLIGHTS = SingleFlight()
+
+
+class CoalescingLLM:
+    """
+    invoke() goes through LLM_FLIGHTS; stream() and every other attribute are passed to
+    the wrapped LLM. Streams are not shared because each client reads its own chunks.
+    """
+
+    def __init__(self, llm, profile, flights=LLM_FLIGHTS):
+        self.llm = llm
+        self.profile = profile
+        self.flights = flights
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def invoke(self, prompt, **kwargs):
+        key = flight_key(self.profile, getattr(self.llm, "model_id", None), prompt, kwargs)
+        return self.flights.do(key, lambda: self.llm.invoke(prompt, **kwargs), profile=self.profile)
@@ -0,0 +1,64 @@
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+
+# --- Per-stage request timings ---
+# The orchestrators record how long each pipeline stage takes (categorization, user data,
+# conversation and prompt context, generation, saving the exchange, and the raw LLM calls).
+# Totals and a window of recent samples per stage are shown on /health; the end-to-end
+# benchmark diffs the totals before and after a run to get a per-stage breakdown.
+STAGE_WINDOW = 1000
+
+
+class StageTimings:
+    def __init__(self, window=STAGE_WINDOW):
+        self.window = window
+        self._stages = {}  # stage -> [count, total_seconds, deque of recent seconds]
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, deque(maxlen=self.window)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        """Decorator form of time()."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            snapshot = {stage: (count, total, sorted(recent)) for stage, (count, total, recent) in self._stages.items()}
+        return {
+            stage: {
+                "count": count,
+                "total_seconds": round(total, 4),
+                "avg_ms": round(total / count * 1000, 2),
+                "p50_ms": round(recent[len(recent) // 2] * 1000, 2),
+                "p95_ms": round(recent[max(0, int(len(recent) * 0.95) - 1)] * 1000, 2),
+            }
+            for stage, (count, total, recent) in snapshot.items()
+        }
+
+
+STAGE_TIMINGS = StageTimings()
+timed = STAGE_TIMINGS.timed
@@ -0,0 +1,322 @@
+import io
+import os
+import csv
+import json
+import threading
+
+import numpy as np
+
+# --- Columnar symptom log table ---
+# userLogData.csv keeps one row per user with every symptom as a stringified date list and
+# period/mood as JSON objects. At load time it is normalized into a long table of
+# (user, symptom, date, intensity) numpy columns sorted by user and date, and cached as an
+# .npz file next to the CSV. Request-time queries are array slices with no string parsing.
+#
+# Entries logged at runtime are appended to a long-format journal CSV
+# (user_id,symptom,date,intensity) instead of rewriting the wide file. The journal is
+# replayed on top of the table whenever the CSV is reloaded, and rows appended by other
+# workers are picked up incrementally by reading past the last consumed offset.
+SYMPTOM_LOG_CACHE = os.getenv("SYMPTOM_LOG_CACHE", os.path.join("data", "index", "symptom_logs.npz"))
+SYMPTOM_LOG_JOURNAL = os.getenv("SYMPTOM_LOG_JOURNAL", os.path.join("data", "userLogEntries.csv"))
+
+PERIOD_INTENSITY = {"Light": 1, "Medium": 2, "Heavy": 3}
+PERIOD_LABELS = {value: key for key, value in PERIOD_INTENSITY.items()}
+MOOD_PREFIX = "Mood: "
+PERIOD_SYMPTOM = "Period"
+
+
+def _parse_date_list(cell):
+    # "[2024-05-02,2024-05-15]" is not valid JSON or Python, so split it by hand
+    cell = (cell or "").strip().strip("[]")
+    return [part.strip().strip("'\"") for part in cell.split(",") if part.strip()]
+
+
+def _parse_json_pairs(cell):
+    # object_pairs_hook keeps repeated keys such as two "Light" period entries
+    if not cell or not cell.strip():
+        return []
+    try:
+        return json.loads(cell, object_pairs_hook=list)
+    except json.JSONDecodeError:
+        return []
+
+
+def parse_log_rows(path):
+    """Yield (user_id, symptom, iso_date, intensity) tuples from the wide CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            user_id = row.pop("user_id", None)
+            if not user_id:
+                continue
+            for column, cell in row.items():
+                if column == "period":
+                    for label, dates in _parse_json_pairs(cell):
+                        for date in dates:
+                            yield user_id, PERIOD_SYMPTOM, date, PERIOD_INTENSITY.get(label, 0)
+                elif column == "mood":
+                    for mood, dates in _parse_json_pairs(cell):
+                        for date in dates:
+                            yield user_id, MOOD_PREFIX + mood, date, 1
+                else:
+                    for date in _parse_date_list(cell):
+                        yield user_id, column, date, 1
+
+
+class SymptomLogTable:
+    """
+    Long-format symptom log columns:
+    user (int32 code), symptom (int16 code), date (datetime64[D]) and intensity (int8),
+    sorted by user then date. `offsets` maps user_id -> (start, stop) row range.
+    """
+
+    def __init__(self, users, symptoms, user_codes, symptom_codes, dates, intensity, source_mtime=None):
+        self.users = list(users)
+        self.symptoms = list(symptoms)
+        self.user_codes = user_codes
+        self.symptom_codes = symptom_codes
+        self.dates = dates
+        self.intensity = intensity
+        self.source_mtime = source_mtime
+        self.offsets = {}
+        if len(user_codes):
+            boundaries = np.flatnonzero(np.diff(user_codes)) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(user_codes)]))
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                self.offsets[self.users[int(user_codes[start])]] = (start, stop)
+
+    @classmethod
+    def from_csv(cls, path):
+        users, symptoms = {}, {}
+        user_codes, symptom_codes, dates, intensity = [], [], [], []
+        for user_id, symptom, date, level in parse_log_rows(path):
+            try:
+                day = np.datetime64(date, "D")
+            except ValueError:
+                continue
+            user_codes.append(users.setdefault(user_id, len(users)))
+            symptom_codes.append(symptoms.setdefault(symptom, len(symptoms)))
+            dates.append(day)
+            intensity.append(level)
+
+        user_codes = np.asarray(user_codes, dtype=np.int32)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        order = np.lexsort((dates, user_codes))
+        return cls(
+            users,
+            symptoms,
+            user_codes[order],
+            np.asarray(symptom_codes, dtype=np.int16)[order],
+            dates[order],
+            np.asarray(intensity, dtype=np.int8)[order],
+            source_mtime=os.stat(path).st_mtime,
+        )
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            users=np.asarray(self.users, dtype=str),
+            symptoms=np.asarray(self.symptoms, dtype=str),
+            user_codes=self.user_codes,
+            symptom_codes=self.symptom_codes,
+            dates=self.dates,
+            intensity=self.intensity,
+            source_mtime=np.float64(self.source_mtime or 0.0),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["users"].tolist(),
+                data["symptoms"].tolist(),
+                data["user_codes"],
+                data["symptom_codes"],
+                data["dates"],
+                data["intensity"],
+                source_mtime=float(data["source_mtime"]),
+            )
+
+    @classmethod
+    def load_or_build(cls, csv_path, cache_path=SYMPTOM_LOG_CACHE):
+        """Open the .npz cache, rebuilding it when the CSV has changed since it was written."""
+        csv_mtime = os.stat(csv_path).st_mtime
+        if cache_path and os.path.exists(cache_path):
+            try:
+                table = cls.load(cache_path)
+                if table.source_mtime == csv_mtime:
+                    return table
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Symptom log cache unreadable, rebuilding: {e}")
+        table = cls.from_csv(csv_path)
+        if cache_path:
+            try:
+                table.save(cache_path)
+            except OSError as e:
+                print(f"Could not write symptom log cache {cache_path}: {e}")
+        return table
+
+    def with_entries(self, entries):
+        """Return a new table with (user_id, symptom, iso_date, intensity) entries added."""
+        users = {name: code for code, name in enumerate(self.users)}
+        symptoms = {name: code for code, name in enumerate(self.symptoms)}
+        user_codes = [users.setdefault(user_id, len(users)) for user_id, _, _, _ in entries]
+        symptom_codes = [symptoms.setdefault(symptom, len(symptoms)) for _, symptom, _, _ in entries]
+        user_codes = np.concatenate((self.user_codes, np.asarray(user_codes, dtype=np.int32)))
+        symptom_codes = np.concatenate((self.symptom_codes, np.asarray(symptom_codes, dtype=np.int16)))
+        dates = np.concatenate((self.dates, np.asarray([day for _, _, day, _ in entries], dtype="datetime64[D]")))
+        intensity = np.concatenate((self.intensity, np.asarray([level for _, _, _, level in entries], dtype=np.int8)))
+        order = np.lexsort((dates, user_codes))
+        return SymptomLogTable(
+            users, symptoms, user_codes[order], symptom_codes[order], dates[order], intensity[order],
+            source_mtime=self.source_mtime,
+        )
+
+    def __contains__(self, user_id):
+        return user_id in self.offsets
+
+    def user_rows(self, user_id, start=None, end=None):
+        """Return (symptom_codes, dates, intensity) for a user, optionally within [start, end]."""
+        span = self.offsets.get(user_id)
+        if span is None:
+            empty = slice(0, 0)
+            return self.symptom_codes[empty], self.dates[empty], self.intensity[empty]
+        lo, hi = span
+        dates = self.dates[lo:hi]
+        if start is not None:
+            lo += int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        if end is not None:
+            hi = span[0] + int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        return self.symptom_codes[lo:hi], self.dates[lo:hi], self.intensity[lo:hi]
+
+    def counts(self, user_id, start=None, end=None):
+        """Return {symptom: number of logged days} for a user."""
+        codes, _, _ = self.user_rows(user_id, start, end)
+        totals = np.bincount(codes, minlength=len(self.symptoms))
+        return {self.symptoms[code]: int(totals[code]) for code in np.flatnonzero(totals)}
+
+    def user_logs(self, user_id):
+        """
+        Return the user's logs as {symptom: [iso dates]}, or None for an unknown user.
+        Period days are keyed by flow ("Period: Light") and moods as "Mood: <name>".
+        """
+        if user_id not in self.offsets:
+            return None
+        codes, dates, intensity = self.user_rows(user_id)
+        logs = {}
+        for code, day, level in zip(codes.tolist(), dates.astype(str).tolist(), intensity.tolist()):
+            symptom = self.symptoms[code]
+            if symptom == PERIOD_SYMPTOM:
+                symptom = f"{PERIOD_SYMPTOM}: {PERIOD_LABELS.get(level, 'Unknown')}"
+            logs.setdefault(symptom, []).append(day)
+        return logs
+
+
+def _empty_table():
+    return SymptomLogTable([], [], np.empty(0, np.int32), np.empty(0, np.int16),
+                           np.empty(0, "datetime64[D]"), np.empty(0, np.int8))
+
+
+def _journal_entry(row):
+    # Malformed journal lines are skipped rather than failing the whole reload
+    try:
+        user_id, symptom, day, level = row
+        return user_id, symptom, np.datetime64(day, "D"), int(level)
+    except ValueError:
+        return None
+
+
+class SymptomLogStore:
+    """
+    Thread-safe holder that swaps in a rebuilt table when the CSV changes and applies
+    journal entries on top of it. append() writes new entries to the journal, so they
+    survive reloads and reach every worker.
+    """
+
+    def __init__(self, csv_path, cache_path=SYMPTOM_LOG_CACHE, journal_path=SYMPTOM_LOG_JOURNAL):
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+        self.journal_path = journal_path
+        self.table = None
+        self._journal_offset = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)load the table and replay the journal; returns False when the CSV is missing."""
+        try:
+            table = SymptomLogTable.load_or_build(self.csv_path, self.cache_path)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            entries, self._journal_offset = self._read_journal(0)
+            self.table = table.with_entries(entries) if entries else table
+        return True
+
+    def _read_journal(self, offset):
+        """Complete journal lines after offset, as (entries, new offset)."""
+        if not self.journal_path:
+            return [], offset
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+        # A line still being written by another worker is left for the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        rows = csv.reader(complete.decode("utf-8").splitlines())
+        entries = [entry for entry in map(_journal_entry, rows) if entry is not None]
+        return entries, offset + len(complete)
+
+    def append(self, user_id, entries):
+        """
+        Journal (symptom, iso_date, intensity) entries for a user and apply them.
+        Returns the users whose rows changed, including entries other workers appended.
+        """
+        for _, day, _ in entries:
+            np.datetime64(day, "D")  # reject bad dates before anything is written
+        lines = io.StringIO()
+        csv.writer(lines, lineterminator="\n").writerows(
+            (user_id, symptom, day, int(level)) for symptom, day, level in entries
+        )
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # One O_APPEND write per call keeps concurrent workers' lines whole
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines.getvalue())
+        return self.refresh()
+
+    def refresh(self):
+        """Apply journal lines appended since the last read; returns the affected users."""
+        with self._lock:
+            entries, self._journal_offset = self._read_journal(self._journal_offset)
+            if not entries:
+                return set()
+            self.table = (self.table or _empty_table()).with_entries(entries)
+        return {user_id for user_id, _, _, _ in entries}
+
+    def journal_changed(self):
+        if not self.journal_path:
+            return False
+        try:
+            return os.stat(self.journal_path).st_size != self._journal_offset
+        except FileNotFoundError:
+            return False
+
+    def changed(self):
+        try:
+            mtime = os.stat(self.csv_path).st_mtime
+        except FileNotFoundError:
+            return False
+        return self.table is None or mtime != self.table.source_mtime
+
+    def get(self, user_id):
+        table = self.table
+        return table.user_logs(user_id) if table is not None else None
@@ -0,0 +1,130 @@
+import numpy as np
+
+from agents.symptom_logs import MOOD_PREFIX
+
+# --- Precomputed per-user symptom summaries ---
+# Counts, recency windows and trends are computed for every user in one vectorized pass
+# when the log table is (re)loaded, and recomputed for a single user when entries are
+# logged for them. Windows are relative to the user's latest logged day, so old data sets
+# still produce meaningful "recent" figures.
+RECENT_DAYS = 7
+WINDOW_DAYS = 30
+
+
+def _trend(current, previous):
+    if previous == 0 and current:
+        return "new"
+    if current > previous:
+        return "rising"
+    if current < previous:
+        return "falling"
+    return "steady"
+
+
+def render_summary(symptoms):
+    """Render per-symptom stats as the bullet list shown to the agents."""
+    if not symptoms:
+        return "No specific symptoms or moods logged recently."
+    lines = []
+    moods = []
+    for name, stats in symptoms.items():
+        if name.startswith(MOOD_PREFIX):
+            moods.append(name[len(MOOD_PREFIX):])
+            continue
+        lines.append(
+            f"- Logged '{name}' {stats['count']} times "
+            f"({stats['last_30_days']} in the last {WINDOW_DAYS} days, {stats['trend']}), "
+            f"last on {stats['last_date']}."
+        )
+    if moods:
+        lines.append(f"- Logged moods including: {', '.join(moods)}.")
+    return "\n".join(lines)
+
+
+class SymptomSummaryCache:
+    """
+    user_id -> {"as_of": iso date, "symptoms": {name: stats}, "text": rendered summary}.
+    stats holds count, last_7_days, last_30_days, previous_30_days, trend and last_date.
+    """
+
+    def __init__(self):
+        self.summaries = {}
+
+    def build(self, table):
+        """Summarize every user in the table at once."""
+        summaries = {}
+        if table is not None and len(table.user_codes):
+            n_users, n_symptoms = len(table.users), len(table.symptoms)
+            days = table.dates.astype(np.int64)
+            users = table.user_codes.astype(np.int64)
+
+            latest = np.full(n_users, np.iinfo(np.int64).min)
+            np.maximum.at(latest, users, days)
+            age = latest[users] - days
+            keys = users * n_symptoms + table.symptom_codes.astype(np.int64)
+            size = n_users * n_symptoms
+
+            def window_counts(mask):
+                return np.bincount(keys[mask], minlength=size).reshape(n_users, n_symptoms)
+
+            totals = np.bincount(keys, minlength=size).reshape(n_users, n_symptoms)
+            recent = window_counts(age < RECENT_DAYS)
+            current = window_counts(age < WINDOW_DAYS)
+            previous = window_counts((age >= WINDOW_DAYS) & (age < 2 * WINDOW_DAYS))
+            last_day = np.full(size, np.iinfo(np.int64).min)
+            np.maximum.at(last_day, keys, days)
+            last_day = last_day.reshape(n_users, n_symptoms)
+
+            for user_code, symptom_code in zip(*np.nonzero(totals)):
+                user_id = table.users[user_code]
+                summary = summaries.get(user_id)
+                if summary is None:
+                    summary = {
+                        "as_of": str(np.datetime64(int(latest[user_code]), "D")),
+                        "symptoms": {},
+                    }
+                    summaries[user_id] = summary
+                summary["symptoms"][table.symptoms[symptom_code]] = {
+                    "count": int(totals[user_code, symptom_code]),
+                    "last_7_days": int(recent[user_code, symptom_code]),
+                    "last_30_days": int(current[user_code, symptom_code]),
+                    "previous_30_days": int(previous[user_code, symptom_code]),
+                    "trend": _trend(current[user_code, symptom_code], previous[user_code, symptom_code]),
+                    "last_date": str(np.datetime64(int(last_day[user_code, symptom_code]), "D")),
+                }
+            for summary in summaries.values():
+                summary["text"] = render_summary(summary["symptoms"])
+        self.summaries = summaries
+
+    def update_user(self, table, user_id):
+        """Recompute one user's summary after their entries changed."""
+        symptom_codes, dates, _ = table.user_rows(user_id)
+        if not len(dates):
+            self.summaries.pop(user_id, None)
+            return
+        days = dates.astype(np.int64)
+        latest = int(days.max())
+        age = latest - days
+        symptoms = {}
+        for code in np.unique(symptom_codes):
+            mask = symptom_codes == code
+            current = int(np.count_nonzero(mask & (age < WINDOW_DAYS)))
+            previous = int(np.count_nonzero(mask & (age >= WINDOW_DAYS) & (age < 2 * WINDOW_DAYS)))
+            symptoms[table.symptoms[int(code)]] = {
+                "count": int(np.count_nonzero(mask)),
+                "last_7_days": int(np.count_nonzero(mask & (age < RECENT_DAYS))),
+                "last_30_days": current,
+                "previous_30_days": previous,
+                "trend": _trend(current, previous),
+                "last_date": str(np.datetime64(int(days[mask].max()), "D")),
+            }
+        # Keep the table's symptom order so the text matches a bulk rebuild
+        ordered = {name: symptoms[name] for name in table.symptoms if name in symptoms}
+        self.summaries[user_id] = {
+            "as_of": str(np.datetime64(latest, "D")),
+            "symptoms": ordered,
+            "text": render_summary(ordered),
+        }
+
+    def get(self, user_id):
+        return self.summaries.get(user_id)
@@ -0,0 +1,209 @@
+import os
+import json
+import shutil
+import hashlib
+from contextlib import contextmanager
+
+from agents.corpus import read_snapshot_manifest, load_snapshot_documents
+
+# --- Persistent vector indexes for the RAG agents ---
+# Each index lives in its own directory under INDEX_ROOT together with a manifest.json
+# describing what it was built from: index settings (chunking, embedding model), source URLs
+# and, per document, the snapshot hash and chunk ids that were embedded. Indexes are built
+# from the local corpus snapshots only (see agents/corpus.py and agents/ingest.py).
+# Building or updating an index holds an exclusive file lock next to its directory, so
+# worker processes starting together never rmtree and rebuild the same index at once.
+# Indexes built from the offline hash embeddings (EMBEDDINGS_BACKEND=hash) are kept apart
+INDEX_ROOT = os.getenv("INDEX_DIR", os.path.join(
+    "data", "index-hash" if os.getenv("EMBEDDINGS_BACKEND") == "hash" else "index"
+))
+MANIFEST_FILE = "manifest.json"
+
+# Changing any of these invalidates every embedded chunk
+INDEX_SETTINGS = ("collection_name", "chunk_size", "chunk_overlap", "embedding_model_id")
+
+
+def build_manifest(collection_name, urls, chunk_size, chunk_overlap, embedding_model_id):
+    """Describe everything that determines the content of an index."""
+    return {
+        "collection_name": collection_name,
+        "source_urls": sorted(urls),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model_id": embedding_model_id,
+    }
+
+
+def read_manifest(index_dir):
+    """Return the manifest stored in index_dir, or None if there is no usable one."""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_manifest(index_dir, manifest):
+    """Atomically write the manifest so a half-written file is never read back."""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _same_settings(stored, manifest):
+    return all(stored.get(key) == manifest[key] for key in INDEX_SETTINGS)
+
+
+def _chunk_ids(url, sha256, count):
+    # Deterministic ids let a changed document's old chunks be deleted precisely
+    prefix = hashlib.sha1(f"{url}:{sha256}".encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+@contextmanager
+def index_lock(index_dir):
+    """Exclusive cross-process lock for building index_dir (held on a sibling .lock file)."""
+    os.makedirs(os.path.dirname(index_dir) or ".", exist_ok=True)
+    with open(index_dir + ".lock", "a") as f:
+        try:
+            import fcntl
+        except ImportError:
+            # No flock on Windows; only one process may build there
+            yield
+            return
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _manifest_matches(stored, manifest):
+    return stored is not None and all(stored.get(key) == value for key, value in manifest.items())
+
+
+def _open_collection(collection_name, embeddings, index_dir):
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=index_dir,
+    )
+
+
+def sync_index(collection_name, urls, embeddings, embedding_model_id,
+               chunk_size=300, chunk_overlap=30, index_root=INDEX_ROOT, force=False):
+    """
+    Bring the persisted index in line with the local snapshots.
+    Only documents whose snapshot hash changed are re-split and re-embedded; the whole
+    collection is rebuilt only when the index settings change (or force is set).
+    Returns (vectorstore, stats) where vectorstore is None if nothing could be indexed.
+    """
+    index_dir = os.path.join(index_root, collection_name)
+    with index_lock(index_dir):
+        return _sync_index_locked(collection_name, urls, embeddings, embedding_model_id,
+                                  chunk_size, chunk_overlap, index_dir, force)
+
+
+def _sync_index_locked(collection_name, urls, embeddings, embedding_model_id,
+                       chunk_size, chunk_overlap, index_dir, force=False):
+    manifest = build_manifest(collection_name, urls, chunk_size, chunk_overlap, embedding_model_id)
+    stored = read_manifest(index_dir)
+
+    if stored is None or force or not _same_settings(stored, manifest):
+        if os.path.isdir(index_dir):
+            shutil.rmtree(index_dir)
+        indexed = {}
+    else:
+        indexed = stored.get("documents", {})
+
+    snapshots = read_snapshot_manifest()
+    documents = {}
+    new_splits, new_ids = [], []
+    text_splitter = None
+    stats = {"unchanged": 0, "embedded": 0, "removed": 0, "missing": 0, "chunks": 0}
+
+    for url in urls:
+        record = snapshots.get(url)
+        previous = indexed.get(url)
+        if record is None:
+            stats["missing"] += 1
+            if previous:
+                documents[url] = previous
+            print(f"   - No local snapshot for {url}, run `python -m agents.ingest`")
+            continue
+        if previous and previous["sha256"] == record["sha256"]:
+            documents[url] = previous
+            stats["unchanged"] += 1
+            continue
+
+        if text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
+        splits = text_splitter.split_documents(load_snapshot_documents(url, record))
+        ids = _chunk_ids(url, record["sha256"], len(splits))
+        new_splits.extend(splits)
+        new_ids.extend(ids)
+        documents[url] = {"sha256": record["sha256"], "chunk_ids": ids}
+        stats["embedded"] += 1
+        stats["chunks"] += len(splits)
+
+    # Chunks of documents that changed or were dropped from the source list
+    stale_ids = []
+    for url, previous in indexed.items():
+        if documents.get(url) is not previous:
+            stale_ids.extend(previous["chunk_ids"])
+            if url not in documents:
+                stats["removed"] += 1
+
+    if not documents:
+        print(f"   - Index '{collection_name}' has no documents available")
+        return None, stats
+
+    vectorstore = _open_collection(collection_name, embeddings, index_dir)
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+    if new_splits:
+        print(f"   - Embedding {len(new_splits)} chunks into '{collection_name}'...")
+        vectorstore.add_documents(new_splits, ids=new_ids)
+
+    manifest["documents"] = documents
+    # The manifest is written last so an interrupted build is never mistaken for a complete one
+    write_manifest(index_dir, manifest)
+    return vectorstore, stats
+
+
+def load_or_build_index(collection_name, urls, embeddings, embedding_model_id,
+                        chunk_size=300, chunk_overlap=30, index_root=INDEX_ROOT):
+    """
+    Open the persisted Chroma collection for these sources. If the manifest no longer
+    matches (URLs, chunk parameters, embedding model) the index is brought up to date from
+    the local snapshots; the network is never used here. Returns None if nothing is indexed.
+    """
+    index_dir = os.path.join(index_root, collection_name)
+    manifest = build_manifest(collection_name, urls, chunk_size, chunk_overlap, embedding_model_id)
+    stored = read_manifest(index_dir)
+
+    if _manifest_matches(stored, manifest):
+        print(f"   - Loading persisted index from {index_dir}...")
+        return _open_collection(collection_name, embeddings, index_dir)
+
+    with index_lock(index_dir):
+        # Another worker may have finished the build while this one waited for the lock
+        if _manifest_matches(read_manifest(index_dir), manifest):
+            print(f"   - Loading index built by another worker from {index_dir}...")
+            return _open_collection(collection_name, embeddings, index_dir)
+        print(f"   - Index at {index_dir} is missing or out of date, syncing from local snapshots...")
+        vectorstore, _ = _sync_index_locked(
+            collection_name, urls, embeddings, embedding_model_id, chunk_size, chunk_overlap, index_dir
+        )
+    return vectorstore
@@ -1,16 +1,19 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
 import os
 import sys
+import json
 from dotenv import load_dotenv
-from langchain_ibm import WatsonxLLM
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
 
 # Add the agents directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'agents'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'whatsapp_connection'))
 
 from agents.orchestrator import Orchestrator
+from agents.registry import get_agent_registry
+from agents.llm_factory import llm_stats
+from agents.batch import BatchRunner
+from agents.stage_timing import STAGE_TIMINGS
 from whatsapp_connection import WhatsAppBot
 
 # Load environment variables
@@ -21,37 +24,19 @@ app = Flask(__name__)
 # Enable CORS for all domains on all routes
 CORS(app, origins=['http://localhost:3000', 'http://127.0.0.1:3000'])
 
-# Initialize Watson LLM
-url = os.getenv("URL")
-apikey = os.getenv("API_KEY")
-project_id = os.getenv("PROJECT_ID")
-
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    apikey=apikey,
-    project_id=project_id,
-    params={
-        GenParams.DECODING_METHOD: "greedy",
-        GenParams.TEMPERATURE: 0.3,  # Lower temperature for more focused responses
-        GenParams.MIN_NEW_TOKENS: 10,
-        GenParams.MAX_NEW_TOKENS: 150,
-        GenParams.STOP_SEQUENCES: [
-            "Human:", 
-            "Observation",
-            "USER QUESTION:",
-            "ASSISTANT:",
-            "User:",
-            "Assistant:"
-        ],
-    },
-)
+# Agents and user data are built once and shared by the web and WhatsApp channels.
+# Each component gets its generation profile from agents/llm_factory.py, all sharing
+# one pooled watsonx.ai client.
+agent_registry = get_agent_registry()
 
 # Initialize orchestrator
-orchestrator = Orchestrator(llm)
+orchestrator = Orchestrator(registry=agent_registry)
 
-# Initialize WhatsApp bot (now with its own WhatsApp orchestrator)
-whatsapp_bot = WhatsAppBot()
+# Bulk answering over a bounded worker pool, shared by all /batch requests
+batch_runner = BatchRunner(orchestrator)
+
+# Initialize WhatsApp bot (its WhatsApp orchestrator routes through the same registry)
+whatsapp_bot = WhatsAppBot(agent_registry)
 
 @app.route('/')
 def home():
@@ -98,6 +83,70 @@ def chat():
             'status': 'error'
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream the orchestrated answer as Server-Sent Events.
+    Emits a `category` event first, then `token` events as the model generates,
+    and a final `done` event carrying the complete cleaned response (or an `error`
+    event when the model fails or times out, in which case nothing is saved).
+    """
+    data = request.get_json(silent=True)
+    if not data or 'query' not in data or 'user_id' not in data:
+        return jsonify({'error': 'Request must include "query" and "user_id"'}), 400
+
+    user_query = data['query'].strip()
+    user_id = data['user_id'].strip()
+
+    if not user_query or not user_id:
+        return jsonify({'error': 'Empty query or user_id provided'}), 400
+
+    print(f"Streaming orchestration for user '{user_id}': {user_query}")
+
+    def generate():
+        try:
+            for event, payload in orchestrator.stream_categorization_pipeline(user_query, user_id):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            print(f"Error streaming chat query: {str(e)}")
+            yield f"event: error\ndata: {json.dumps(f'Server error: {str(e)}')}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """
+    Answer many queries in one request. Body: {"items": [{"query": ..., "user_id": ...}, ...]}.
+    Results come back in request order, each with its own status.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Request must include a non-empty "items" list'}), 400
+    if len(items) > batch_runner.max_items:
+        return jsonify({'error': f'A batch may contain at most {batch_runner.max_items} items'}), 400
+
+    try:
+        print(f"Processing batch of {len(items)} queries")
+        results = batch_runner.run(items)
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return jsonify({
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'status': 'success' if not failed else 'partial'
+        })
+    except Exception as e:
+        print(f"Error processing batch: {str(e)}")
+        return jsonify({
+            'error': f'Server error: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @app.route('/basicquery', methods=['POST'])
 def basicquery():
     """
@@ -161,15 +210,9 @@ def consultation():
         print(f"Processing consultation query: {user_query}")
         
         # Process query directly through exercise agent
-        result = orchestrator.consultation_agent.run(user_query)
-        
-        print(f"Consultation agent result: {result}")
+        response_text = orchestrator.run_unpersonalized("CONSULTATION", user_query)
         
-        # Handle different result formats from agents
-        if isinstance(result, dict) and 'output' in result:
-            response_text = result['output']
-        else:
-            response_text = str(result)
+        print(f"Consultation agent result: {response_text}")
         
         return jsonify({
             'query': user_query,
@@ -207,15 +250,9 @@ def exercise():
         print(f"Processing exercise query: {user_query}")
         
         # Process query directly through exercise agent
-        result = orchestrator.exercise_agent.run(user_query)
+        response_text = orchestrator.run_unpersonalized("EXERCISE", user_query)
         
-        print(f"Exercise agent result: {result}")
-        
-        # Handle different result formats from agents
-        if isinstance(result, dict) and 'output' in result:
-            response_text = result['output']
-        else:
-            response_text = str(result)
+        print(f"Exercise agent result: {response_text}")
         
         return jsonify({
             'query': user_query,
@@ -253,15 +290,9 @@ def diet():
         print(f"Processing diet query: {user_query}")
         
         # Process query directly through diet agent
-        result = orchestrator.diet_agent.run(user_query)
+        response_text = orchestrator.run_unpersonalized("DIET", user_query)
         
-        print(f"Diet agent result: {result}")
-        
-        # Handle different result formats from agents
-        if isinstance(result, dict) and 'output' in result:
-            response_text = result['output']
-        else:
-            response_text = str(result)
+        print(f"Diet agent result: {response_text}")
         
         return jsonify({
             'query': user_query,
@@ -277,6 +308,37 @@ def diet():
             'status': 'error'
         }), 500
 
+@app.route('/symptoms', methods=['POST'])
+def log_symptoms():
+    """
+    Log symptoms for a user. Body: {"user_id": ..., "entries": [{"symptom": ..., "date": "YYYY-MM-DD",
+    "intensity": 1}, ...]}. Only this user's symptom summary is recomputed.
+    """
+    data = request.get_json(silent=True)
+    entries = data.get('entries') if isinstance(data, dict) else None
+    user_id = str(data.get('user_id') or '').strip() if isinstance(data, dict) else ''
+    if not user_id or not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Request must include "user_id" and a non-empty "entries" list'}), 400
+
+    try:
+        rows = [(entry['symptom'], entry['date'], entry.get('intensity', 1)) for entry in entries]
+        agent_registry.log_symptoms(user_id, rows)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid entry: {str(e)}', 'status': 'error'}), 400
+    except Exception as e:
+        print(f"Error logging symptoms: {str(e)}")
+        return jsonify({
+            'error': f'Server error: {str(e)}',
+            'status': 'error'
+        }), 500
+
+    return jsonify({
+        'user_id': user_id,
+        'logged': len(rows),
+        'summary': agent_registry.get_log_summary(user_id),
+        'status': 'success'
+    })
+
 # @app.route('/health', methods=['GET'])
 # def health_check():
 #     """Health check endpoint"""
@@ -299,15 +361,27 @@ def health_check():
         'message': 'Bloom AI Backend is running successfully',
         'available_endpoints': {
             'chat': 'POST /chat - General queries routed through orchestrator',
+            'chat_stream': 'POST /chat/stream - Orchestrated answer streamed as Server-Sent Events',
+            'batch': 'POST /batch - Many queries answered in one request',
             'basicquery': 'POST /basicquery - Basic queries',
             'consultation': 'POST /consultation - Consultation-specific queries',
             'exercise': 'POST /exercise - Exercise-specific queries',
             'diet': 'POST /diet - Diet-specific queries',
+            'symptoms': 'POST /symptoms - Log symptoms for a user',
             'whatsapp': 'POST /whatsapp - WhatsApp webhook for Twilio',
             'health': 'GET /health - Health check'
         },
         'cors_enabled': True,
-        'frontend_url': 'http://localhost:3000'
+        'frontend_url': 'http://localhost:3000',
+        'caches': agent_registry.cache_stats(),
+        'whatsapp_queue': whatsapp_bot.dispatcher.stats() if whatsapp_bot.dispatcher else None,
+        'conversations': {
+            'web': orchestrator.conversation_history.stats(),
+            'whatsapp': whatsapp_bot.orchestrator.conversation_history.stats()
+        },
+        'sessions': agent_registry.session_store.stats(),
+        'llm': llm_stats(),
+        'stages': STAGE_TIMINGS.stats()
     })
 
 @app.route('/whatsapp', methods=['POST'])
@@ -397,10 +471,12 @@ if __name__ == '__main__':
     print("Available endpoints:")
     print("- GET  /           : Main page with query form")
     print("- POST /chat       : General queries (routed through orchestrator)")
+    print("- POST /chat/stream : Streaming general queries (Server-Sent Events)")
     print("- POST /exercise   : Exercise-specific queries")
     print("- POST /basicquery       : Basic queries")
     print("- POST /consultation       : Consultation-specific queries")
     print("- POST /diet       : Diet-specific queries")
+    print("- POST /symptoms   : Log symptoms for a user")
     print("- POST /whatsapp   : WhatsApp webhook for Twilio")
     print("- POST /whatsapp/send : Send WhatsApp message programmatically")
     print("- POST /whatsapp/register : Register user profile for WhatsApp")
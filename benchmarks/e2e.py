@@ -0,0 +1,398 @@
+"""
+End-to-end latency and throughput benchmark for the HTTP endpoints.
+
+Drives /chat, /chat/stream, /basicquery, the per-agent endpoints and the /whatsapp webhook
+at increasing concurrency. By default the app is loaded in-process (Flask test client) with
+the offline backends from agents/fakes.py, so runs need no credentials and are reproducible;
+--backend real keeps the configured watsonx/Twilio backends, and --url targets a running
+server instead. For every endpoint and concurrency level the report lists p50/p95/p99
+latency, requests per second, time to first token (/chat/stream) and the mean time per
+pipeline stage, taken from the stage timings on /health. With --baseline, the run is
+compared against a saved one and the script exits non-zero on regressions.
+
+Note: with WHATSAPP_ASYNC the webhook latency only measures the acknowledgement; answers
+are delivered by the background workers. Each level waits for those deliveries to finish
+before it is reported, so req/s, the stage times and the error count include them.
+
+Usage:
+    python benchmarks/e2e.py
+    python benchmarks/e2e.py --endpoints chat chat_stream --concurrency 1 8 32 --requests 100
+    python benchmarks/e2e.py --save benchmarks/e2e_baseline.json
+    python benchmarks/e2e.py --baseline benchmarks/e2e_baseline.json --tolerance 0.25
+    python benchmarks/e2e.py --url http://localhost:5000 --backend real
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Offline backends used by --backend fake (set before the app is imported)
+FAKE_BACKEND_ENV = {
+    "LLM_BACKEND": "fake",
+    "EMBEDDINGS_BACKEND": "hash",
+    "TWILIO_BACKEND": "fake",
+    "SESSION_BACKEND": "memory",
+}
+
+QUERIES = {
+    "chat": [
+        "What are the early signs of perimenopause?",
+        "Can you suggest a breakfast that helps with hot flashes?",
+        "What exercises are good for bone density after menopause?",
+        "Should I talk to my doctor about hormone therapy?",
+    ],
+    "basicquery": [
+        "What is menopause?",
+        "Why do night sweats happen?",
+        "How long does perimenopause last?",
+    ],
+    "consultation": [
+        "I have had irregular periods and headaches, what could help?",
+        "Is hormone replacement therapy safe for me?",
+    ],
+    "exercise": [
+        "Give me a 20 minute strength routine",
+        "Is yoga helpful for menopause joint pain?",
+    ],
+    "diet": [
+        "Which foods help with bone health?",
+        "What should I eat to sleep better?",
+    ],
+    "whatsapp": [
+        "What is menopause?",
+        "How can I manage hot flashes?",
+    ],
+}
+QUERIES["chat_stream"] = QUERIES["chat"]
+
+ENDPOINTS = {
+    # name -> (path, kind)
+    "chat": ("/chat", "json"),
+    "chat_stream": ("/chat/stream", "stream"),
+    "basicquery": ("/basicquery", "json"),
+    "consultation": ("/consultation", "json"),
+    "exercise": ("/exercise", "json"),
+    "diet": ("/diet", "json"),
+    "whatsapp": ("/whatsapp", "form"),
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, int(round(fraction * len(ordered))) - 1)]
+
+
+def distribution_ms(seconds):
+    return {
+        "p50": _ms(percentile(seconds, 0.50)),
+        "p95": _ms(percentile(seconds, 0.95)),
+        "p99": _ms(percentile(seconds, 0.99)),
+        "max": _ms(max(seconds) if seconds else None),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class InProcessTarget:
+    """Requests through the Flask test client of app.py."""
+
+    def __init__(self):
+        sys.path.insert(0, REPO_ROOT)
+        os.chdir(REPO_ROOT)
+        from app import app, whatsapp_bot
+
+        self.app = app
+        self.dispatcher = whatsapp_bot.dispatcher
+
+    def post(self, path, kind, payload):
+        """Returns (ok, seconds to first body chunk)."""
+        client = self.app.test_client()
+        started = time.perf_counter()
+        if kind == "form":
+            response = client.post(path, data=payload)
+        else:
+            response = client.post(path, json=payload, buffered=False)
+        first = None
+        ok = response.status_code == 200
+        for chunk in response.response:
+            if first is None and (kind != "stream" or b"event: token" in chunk):
+                first = time.perf_counter() - started
+            if kind == "stream" and b"event: error" in chunk:
+                ok = False
+        response.close()
+        return ok, first
+
+    def get_json(self, path):
+        return self.app.test_client().get(path).get_json()
+
+    def queue_stats(self):
+        return self.dispatcher.stats() if self.dispatcher else None
+
+    def drain(self, timeout):
+        """Wait for queued WhatsApp deliveries; False if some are still running at the timeout."""
+        return self.dispatcher is None or self.dispatcher.join(timeout)
+
+
+class HttpTarget:
+    """Requests against a running server."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+        self._requests = requests
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session
+
+    def post(self, path, kind, payload):
+        url = self.base_url + path
+        started = time.perf_counter()
+        if kind == "form":
+            response = self._session().post(url, data=payload, timeout=120)
+            return response.ok, None
+        if kind == "json":
+            response = self._session().post(url, json=payload, timeout=120)
+            return response.ok, None
+        first, ok = None, None
+        with self._session().post(url, json=payload, stream=True, timeout=120) as response:
+            ok = response.ok
+            for line in response.iter_lines():
+                if first is None and line.startswith(b"event: token"):
+                    first = time.perf_counter() - started
+                if line.startswith(b"event: error"):
+                    ok = False
+        return ok, first
+
+    def get_json(self, path):
+        return self._session().get(self.base_url + path, timeout=30).json()
+
+    def queue_stats(self):
+        return self.get_json("/health").get("whatsapp_queue")
+
+    def drain(self, timeout):
+        """Poll /health until the server's WhatsApp queue is empty."""
+        deadline = time.monotonic() + timeout
+        while True:
+            stats = self.queue_stats()
+            if not stats or not stats.get("pending", stats["queued"]):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+
+
+def build_payload(endpoint, number, unique):
+    queries = QUERIES[endpoint]
+    query = queries[number % len(queries)]
+    if unique:
+        # Distinct text per request so the answer caches do not hide the pipeline
+        query = f"{query} (request {number})"
+    user_id = f"bench-user-{number % 50}"
+    if endpoint == "whatsapp":
+        return {
+            "From": f"whatsapp:+1555{number % 50:07d}",
+            "Body": query,
+            "MessageSid": f"SMbench{time.time_ns()}{number}",
+        }
+    return {"query": query, "user_id": user_id}
+
+
+def stage_totals(target):
+    try:
+        return target.get_json("/health").get("stages", {})
+    except Exception as e:
+        print(f"   (stage timings unavailable: {e})")
+        return {}
+
+
+def stage_breakdown(before, after, requests):
+    """Mean milliseconds per request spent in each stage during the run."""
+    breakdown = {}
+    for stage, stats in after.items():
+        previous = before.get(stage, {"count": 0, "total_seconds": 0.0})
+        count = stats["count"] - previous["count"]
+        if count > 0 and requests:
+            spent = stats["total_seconds"] - previous["total_seconds"]
+            breakdown[stage] = {"calls": count, "ms_per_request": round(spent / requests * 1000, 1)}
+    return breakdown
+
+
+def run_level(target, endpoint, concurrency, requests, unique, offset, drain_timeout):
+    """
+    Send `requests` requests to one endpoint with `concurrency` workers. For the WhatsApp
+    webhook the level ends when the background deliveries it queued have finished.
+    """
+    path, kind = ENDPOINTS[endpoint]
+    latencies, first_tokens, errors = [], [], 0
+    lock = threading.Lock()
+
+    def one(number):
+        nonlocal errors
+        payload = build_payload(endpoint, offset + number, unique)
+        started = time.perf_counter()
+        try:
+            ok, first = target.post(path, kind, payload)
+        except Exception as e:
+            print(f"   - request failed: {e}")
+            ok, first = False, None
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+                if kind == "stream" and first is not None:
+                    first_tokens.append(first)
+            else:
+                errors += 1
+
+    before = stage_totals(target)
+    queue_before = target.queue_stats() if kind == "form" else None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    if queue_before and not target.drain(drain_timeout):
+        print(f"   - WhatsApp deliveries still running after {drain_timeout:.0f}s")
+    wall = time.perf_counter() - started
+    after = stage_totals(target)
+    queue_after = target.queue_stats() if queue_before else None
+
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(wall, 2),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": distribution_ms(latencies),
+        "stages": stage_breakdown(before, after, requests),
+    }
+    if kind == "stream":
+        result["ttft_ms"] = distribution_ms(first_tokens)
+    if queue_after:
+        failed = queue_after["failed"] - queue_before["failed"]
+        result["deliveries"] = {
+            "completed": queue_after["completed"] - queue_before["completed"],
+            "failed": failed,
+            "pending": queue_after.get("pending", queue_after["queued"]),
+        }
+        # Lost or failed deliveries count like failed requests
+        result["errors"] += failed + result["deliveries"]["pending"]
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return human readable regressions (p95 latency up or throughput down) vs the baseline."""
+    regressions = []
+    for endpoint, levels in results.items():
+        for level, result in levels.items():
+            before = baseline.get("results", {}).get(endpoint, {}).get(level)
+            if not before:
+                continue
+            p95, base_p95 = result["latency_ms"]["p95"], before["latency_ms"]["p95"]
+            if p95 is not None and base_p95 and p95 > base_p95 * (1 + tolerance):
+                regressions.append(f"{endpoint} @{level}: p95 {p95:.1f}ms > {base_p95:.1f}ms "
+                                   f"(+{tolerance:.0%} allowed)")
+            if before["rps"] and result["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(f"{endpoint} @{level}: {result['rps']:.2f} req/s < {before['rps']:.2f} req/s "
+                                   f"(-{tolerance:.0%} allowed)")
+            if result["errors"] > before.get("errors", 0):
+                regressions.append(f"{endpoint} @{level}: {result['errors']} errors "
+                                   f"(baseline {before.get('errors', 0)})")
+    return regressions
+
+
+def print_result(endpoint, concurrency, result):
+    latency = result["latency_ms"]
+    line = (f"{endpoint:<13} c={concurrency:<3} {result['rps']:>8.2f} req/s  "
+            f"p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms")
+    if "ttft_ms" in result:
+        line += f"  ttft p50 {result['ttft_ms']['p50']}ms"
+    if "deliveries" in result:
+        line += f"  delivered {result['deliveries']['completed']}"
+    if result["errors"]:
+        line += f"  errors {result['errors']}"
+    print(line)
+    stages = ", ".join(f"{stage} {stats['ms_per_request']}ms" for stage, stats in result["stages"].items())
+    if stages:
+        print(f"    stages/request: {stages}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure end-to-end latency and throughput per endpoint.")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS),
+                        help="Endpoints to drive (default: all)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16],
+                        help="Concurrency levels (default: 1 4 16)")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per endpoint and level")
+    parser.add_argument("--backend", choices=("fake", "real"), default="fake",
+                        help="fake: offline stand-ins from agents/fakes.py (in-process only)")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--cache-hits", action="store_true",
+                        help="Repeat the same queries so the answer caches are exercised")
+    parser.add_argument("--drain-timeout", type=float, default=120.0,
+                        help="Seconds to wait for background WhatsApp deliveries per level (default: 120)")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs the baseline (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        if args.backend == "fake":
+            for name, value in FAKE_BACKEND_ENV.items():
+                os.environ.setdefault(name, value)
+        target = InProcessTarget()
+
+    results = {}
+    offset = 0
+    for endpoint in args.endpoints:
+        results[endpoint] = {}
+        for concurrency in args.concurrency:
+            result = run_level(target, endpoint, concurrency, args.requests, not args.cache_hits, offset,
+                               args.drain_timeout)
+            offset += args.requests
+            results[endpoint][str(concurrency)] = result
+            print_result(endpoint, concurrency, result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "target": args.url or "in-process",
+                "backend": os.getenv("LLM_BACKEND", "watsonx") if not args.url else "server",
+                "requests": args.requests,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nEnd-to-end regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo end-to-end regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Import-time benchmark for the backend modules.
+
+Each target is imported in a fresh interpreter with `python -X importtime`, so the numbers
+reflect a real cold start. The report lists the total cost per target and the heaviest
+modules it pulled in. With --baseline, totals are compared against a saved run and the
+script exits non-zero when any target got slower than the allowed tolerance.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --save benchmarks/import_baseline.json
+    python benchmarks/import_time.py --baseline benchmarks/import_baseline.json --tolerance 0.25
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = [
+    "agents.orchestrator",
+    "agents.registry",
+    "whatsapp_connection.whatsapp_orchestrator",
+    "agents.basic_query",
+    "agents.consultation",
+    "agents.exercise",
+    "agents.diet",
+]
+
+# "import time:       412 |       1234 |   package.module"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_import(module, python=sys.executable):
+    """Import module in a fresh interpreter and return its -X importtime records."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    records = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+    return records, error
+
+
+def _dependencies(records, module):
+    """Return the direct imports made while importing module (excluding interpreter startup)."""
+    positions = [i for i, r in enumerate(records) if r["module"] == module]
+    if not positions:
+        return []
+    end = positions[-1]
+    depth = records[end]["depth"]
+    start = end
+    # Nested imports are logged before their parent, indented one level deeper
+    while start > 0 and records[start - 1]["depth"] > depth:
+        start -= 1
+    return [r for r in records[start:end] if r["depth"] == depth + 1]
+
+
+def summarize(module, repeat=3, top=10):
+    """Run the import `repeat` times and keep the median total and one breakdown."""
+    totals, records, error = [], [], None
+    for _ in range(repeat):
+        records, error = measure_import(module)
+        if error:
+            break
+        target = [r for r in records if r["module"] == module]
+        totals.append(target[-1]["cumulative_ms"] if target else sum(r["self_ms"] for r in records))
+
+    heaviest = sorted(_dependencies(records, module), key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(statistics.median(totals), 1) if totals else None,
+        "error": error,
+        "heaviest": [
+            {"module": r["module"], "cumulative_ms": round(r["cumulative_ms"], 1)} for r in heaviest
+        ],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human readable regressions against the baseline run."""
+    previous = {r["module"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["module"])
+        if not before or before.get("total_ms") is None or result["total_ms"] is None:
+            continue
+        limit = before["total_ms"] * (1 + tolerance)
+        if result["total_ms"] > limit:
+            regressions.append(
+                f"{result['module']}: {result['total_ms']:.1f}ms > {before['total_ms']:.1f}ms "
+                f"(+{tolerance:.0%} allowed)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time per module.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS,
+                        help="Modules to import (default: the backend entry points)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest dependencies to list")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs the baseline (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        result = summarize(module, repeat=args.repeat, top=args.top)
+        results.append(result)
+        if result["error"]:
+            print(f"{module}: FAILED ({result['error']})")
+            continue
+        print(f"{module}: {result['total_ms']:.1f} ms")
+        for dep in result["heaviest"]:
+            print(f"    {dep['cumulative_ms']:>9.1f} ms  {dep['module']}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nImport time regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo import time regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import the backend modules as agents.* / whatsapp_connection.*, like app.py does
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+# Offline stand-ins from agents/fakes.py, without simulated latency (set before any import)
+for name, value in {
+    "LLM_BACKEND": "fake",
+    "EMBEDDINGS_BACKEND": "hash",
+    "TWILIO_BACKEND": "fake",
+    "SESSION_BACKEND": "memory",
+    "CONVERSATION_SUMMARY": "false",
+    "FAKE_LLM_LATENCY": "0",
+    "FAKE_LLM_TOKENS_PER_SECOND": "0",
+    "FAKE_TWILIO_LATENCY": "0",
+    "SYMPTOM_LOG_CACHE": "",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,36 @@
+from agents.batch import BatchRunner
+from agents.fakes import FakeLLM
+from agents.orchestrator import Orchestrator
+from agents.registry import AgentRegistry
+
+
+def make_runner(llm):
+    return BatchRunner(Orchestrator(registry=AgentRegistry(llm=llm)), workers=4)
+
+
+def test_results_come_back_in_request_order_with_history():
+    runner = make_runner(FakeLLM(latency=0, tokens_per_second=0))
+    items = [
+        {"query": "What is menopause?", "user_id": "batch-a"},
+        {"query": "", "user_id": "batch-b"},
+        {"query": "Give me a 20 minute strength workout routine", "user_id": "batch-a"},
+        {"query": "Why do night sweats happen?", "user_id": "batch-c"},
+    ]
+
+    results = runner.run(items)
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status"] for result in results] == ["success", "error", "success", "success"]
+    assert results[2]["category"] == "EXERCISE"
+    # Items of one user run in order, so the second sees the first in its history
+    assert len(runner.orchestrator.conversation_history.recent("batch-a", 10)) == 4
+
+
+def test_degraded_answers_are_reported_as_errors():
+    runner = make_runner(FakeLLM(latency=0, tokens_per_second=0, failure_rate=1.0))
+
+    results = runner.run([{"query": "What is menopause?", "user_id": "batch-down"}])
+
+    assert results[0]["status"] == "error"
+    assert "unavailable" in results[0]["error"]
+    assert not runner.orchestrator.conversation_history.has_history("batch-down")
@@ -0,0 +1,42 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import bulk_answer
+from agents.bulk_answer import prepare_output
+from agents.fakes import FakeLLM
+from agents.orchestrator import Orchestrator
+from agents.registry import AgentRegistry
+
+
+def test_prepare_output_repairs_partial_line_and_drops_errors(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text(
+        json.dumps({"id": "1", "status": "success", "response": "a"}) + "\n"
+        + json.dumps({"id": "2", "status": "error", "error": "timeout"}) + "\n"
+        + json.dumps({"id": "1", "status": "success", "response": "a again"}) + "\n"
+        + '{"id": "3", "status": "succ',
+        encoding="utf-8",
+    )
+
+    finished = prepare_output(str(output))
+
+    assert finished == {"1"}
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["1"]
+    with open(output, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "2", "status": "success", "response": "b"}) + "\n")
+    assert prepare_output(str(output)) == {"1", "2"}
+
+
+def test_degraded_answers_are_recorded_as_errors_and_retried(tmp_path, monkeypatch):
+    output = tmp_path / "answers.jsonl"
+    items = [("1", "What is menopause?", "bulk-1")]
+    down = Orchestrator(registry=AgentRegistry(llm=FakeLLM(latency=0, tokens_per_second=0, failure_rate=1.0)))
+    monkeypatch.setattr(bulk_answer, "_orchestrator", down)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        stats = bulk_answer.run(items, str(output), executor, window=1)
+
+    assert stats["failed"] == 1 and stats["succeeded"] == 0
+    assert json.loads(output.read_text(encoding="utf-8"))["status"] == "error"
+    assert prepare_output(str(output)) == set()
@@ -0,0 +1,48 @@
+from agents.classifier import QueryClassifier
+from agents.orchestrator import Orchestrator
+from agents.registry import AgentRegistry
+
+
+def test_obvious_queries_are_routed_confidently():
+    classifier = QueryClassifier()
+    for query, expected in [
+        ("Can you suggest healthy breakfast recipes high in calcium?", "DIET"),
+        ("Give me a 20 minute strength training workout", "EXERCISE"),
+        ("What are the side effects of HRT medication?", "CONSULTATION"),
+        ("Hello", "BASIC_QUERY"),
+    ]:
+        category, confidence = classifier.classify(query)
+        assert category == expected, query
+        assert classifier.is_confident(confidence), query
+
+
+def test_mixed_or_unknown_queries_are_not_confident():
+    classifier = QueryClassifier()
+
+    assert classifier.classify("purple elephants") == ("BASIC_QUERY", 0.0)
+    _, confidence = classifier.classify("Which foods and exercises help with weight gain?")
+    assert not classifier.is_confident(confidence)
+
+
+def test_confident_queries_skip_the_llm_categorizer():
+    orchestrator = Orchestrator(registry=AgentRegistry())
+    calls = []
+    orchestrator._categorize_query = lambda query: calls.append(query) or "DIET"
+
+    assert orchestrator.resolve_category("What should I eat for dinner?") == "DIET"
+    assert calls == []
+    assert orchestrator.resolve_category("Which foods and exercises help with weight gain?") == "DIET"
+    assert len(calls) == 1
+
+
+def test_llm_categorizer_failure_keeps_the_local_guess():
+    orchestrator = Orchestrator(registry=AgentRegistry())
+
+    def unavailable(query):
+        raise TimeoutError("categorizer timed out")
+
+    orchestrator._categorize_query = unavailable
+    query = "Which foods and exercises help with weight gain?"
+    expected, _ = orchestrator.registry.classifier.classify(query)
+
+    assert orchestrator.resolve_category(query) == expected
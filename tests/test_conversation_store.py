@@ -0,0 +1,42 @@
+import threading
+import time
+
+from agents.conversation_store import ConversationStore
+from agents.session_store import MemoryBackend, SessionStore
+
+
+class SlowBackend(MemoryBackend):
+    """Reads for "slow-user" take a while, like a cold disk."""
+
+    def get(self, namespace, key):
+        if key == "slow-user":
+            time.sleep(0.5)
+        return super().get(namespace, key)
+
+
+def test_slow_read_does_not_block_other_users():
+    store = ConversationStore(session_store=SessionStore(SlowBackend(), cache_ttl=0), namespace="conversation:test")
+    store.append_exchange("fast-user", "hi", "hello")
+
+    slow = threading.Thread(target=store.recent, args=("slow-user", 4))
+    slow.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert store.recent("fast-user", 4) == ["hi", "hello"]
+    elapsed = time.monotonic() - started
+    slow.join()
+
+    assert elapsed < 0.3
+
+
+def test_history_is_reloaded_from_the_session_store():
+    session_store = SessionStore(MemoryBackend(), cache_ttl=0)
+    writer = ConversationStore(session_store=session_store, namespace="conversation:test")
+    reader = ConversationStore(session_store=session_store, namespace="conversation:test")
+
+    writer.append_exchange("alice", "q1", "a1")
+    assert reader.recent("alice", 10) == ["q1", "a1"]
+    writer.append_exchange("alice", "q2", "a2")
+    assert reader.recent("alice", 2) == ["q2", "a2"]
+    assert not reader.has_history("bob")
+
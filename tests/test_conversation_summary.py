@@ -0,0 +1,26 @@
+import time
+
+from agents.conversation_summary import ConversationSummarizer
+from agents.session_store import MemoryBackend, SessionStore
+
+
+class SlowLLM:
+    def invoke(self, prompt, **kwargs):
+        time.sleep(0.3)
+        return "LLM summary."
+
+
+def test_overflow_fold_is_not_lost_while_worker_folds_same_user():
+    store = SessionStore(MemoryBackend())
+    summarizer = ConversationSummarizer(SlowLLM(), store, capacity=1)
+
+    summarizer.schedule("conversation:web", "alice", "first question", "first answer")
+    time.sleep(0.05)  # the worker is now inside the slow LLM call for alice
+    summarizer.schedule("conversation:web", "bob", "bob question", "bob answer")  # fills the queue
+    summarizer.schedule("conversation:web", "alice", "second question", "second answer")  # overflow fold
+    summarizer._jobs.join()
+
+    record = store.get("conversation:web:summary", "alice")
+    assert record["turns"] == 2
+    assert "second question" in record["summary"]
+    assert summarizer.stats()["folded_turns"] == 3
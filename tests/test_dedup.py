@@ -0,0 +1,72 @@
+import threading
+import time
+
+from flask import Flask
+
+from agents.registry import AgentRegistry
+from whatsapp_connection.dedup import MessageDeduplicator
+from whatsapp_connection.whatsapp_connection import WhatsAppBot
+
+app = Flask(__name__)
+
+
+def post(bot, sid, body="What is menopause?", sender="whatsapp:+15550000001"):
+    with app.test_request_context("/whatsapp", method="POST", data={"From": sender, "Body": body, "MessageSid": sid}):
+        return bot.process_whatsapp_message()
+
+
+def test_retry_after_completion_reuses_the_result():
+    dedup = MessageDeduplicator()
+    entry, is_new = dedup.begin("SM1")
+    assert is_new
+    dedup.complete("SM1", "<Response/>")
+
+    retry, is_new = dedup.begin("SM1")
+    assert not is_new
+    assert dedup.wait(retry, 0) == "<Response/>"
+    assert dedup.stats()["duplicates"] == 1
+
+
+def test_retry_waits_for_the_in_flight_original():
+    dedup = MessageDeduplicator()
+    dedup.begin("SM2")
+    retry, _ = dedup.begin("SM2")
+    threading.Timer(0.05, dedup.complete, ("SM2", "<Response>done</Response>")).start()
+
+    assert dedup.wait(retry, 1.0) == "<Response>done</Response>"
+
+
+def test_expired_sids_are_processed_again():
+    dedup = MessageDeduplicator(ttl_seconds=0.01)
+    dedup.begin("SM3")
+    time.sleep(0.02)
+    assert dedup.begin("SM3")[1]
+
+
+def test_waiting_retry_takes_over_a_dropped_original():
+    bot = WhatsAppBot(AgentRegistry())
+    submitted = []
+    retry_waiting = threading.Event()
+    submit = bot.dispatcher.submit
+
+    def flaky_submit(key, fn, *args):
+        if not submitted:
+            # The first delivery finds the queue full, after its retry started waiting
+            submitted.append(False)
+            retry_waiting.wait(1.0)
+            time.sleep(0.05)
+            return False
+        submitted.append(True)
+        return submit(key, fn, *args)
+
+    bot.dispatcher.submit = flaky_submit
+    original = threading.Thread(target=post, args=(bot, "SMdropped"))
+    original.start()
+    time.sleep(0.05)
+    retry_waiting.set()
+    retry_twiml = post(bot, "SMdropped")
+    original.join()
+
+    assert submitted == [False, True]
+    assert "<Message>" not in retry_twiml  # acknowledged, the answer is sent in the background
+    assert post(bot, "SMdropped") == retry_twiml
@@ -0,0 +1,79 @@
+import time
+import threading
+
+from whatsapp_connection.dispatcher import OrderedDispatcher
+
+
+def test_join_waits_for_running_jobs():
+    dispatcher = OrderedDispatcher(workers=2, capacity=10)
+    done = []
+    for number in range(4):
+        dispatcher.submit(f"whatsapp:+1555000000{number}", lambda n=number: (time.sleep(0.05), done.append(n)))
+
+    assert dispatcher.join(timeout=2.0)
+    assert sorted(done) == [0, 1, 2, 3]
+    assert dispatcher.stats()["pending"] == 0
+
+
+def test_join_times_out_while_a_job_runs():
+    dispatcher = OrderedDispatcher(workers=1, capacity=10)
+    dispatcher.submit("whatsapp:+15550000000", time.sleep, 0.5)
+
+    assert not dispatcher.join(timeout=0.05)
+    assert dispatcher.join(timeout=2.0)
+
+
+def test_jobs_for_one_key_run_in_arrival_order():
+    dispatcher = OrderedDispatcher(workers=4, capacity=1000)
+    seen = {}
+    lock = threading.Lock()
+
+    def record(key, index):
+        time.sleep(0.001 * (index % 3))
+        with lock:
+            seen.setdefault(key, []).append(index)
+
+    keys = [f"whatsapp:+1555000{n:04d}" for n in range(8)]
+    for index in range(20):
+        for key in keys:
+            assert dispatcher.submit(key, record, key, index)
+
+    assert dispatcher.join(timeout=10)
+    assert seen == {key: list(range(20)) for key in keys}
+
+
+def test_full_queue_rejects_instead_of_blocking():
+    dispatcher = OrderedDispatcher(workers=1, capacity=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    assert dispatcher.submit("a", block)
+    started.wait(5)
+    # One job is running; the queue holds two more and turns the next away
+    assert dispatcher.submit("a", lambda: None)
+    assert dispatcher.submit("b", lambda: None)
+    assert not dispatcher.submit("c", lambda: None)
+    release.set()
+
+    assert dispatcher.join(timeout=5)
+    stats = dispatcher.stats()
+    assert (stats["submitted"], stats["rejected"], stats["completed"]) == (3, 1, 3)
+
+
+def test_failing_job_does_not_stop_the_worker():
+    dispatcher = OrderedDispatcher(workers=1, capacity=10)
+    done = []
+
+    def fail():
+        raise RuntimeError("twilio down")
+
+    dispatcher.submit("a", fail)
+    dispatcher.submit("a", done.append, 1)
+
+    assert dispatcher.join(timeout=5)
+    assert done == [1]
+    assert dispatcher.stats()["failed"] == 1
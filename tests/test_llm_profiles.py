@@ -0,0 +1,20 @@
+from agents.llm_factory import GENERATION_PROFILES, get_llm
+from agents.registry import AgentRegistry
+from whatsapp_connection.whatsapp_orchestrator import whatsappOrchestrator
+
+
+def test_whatsapp_answers_use_the_whatsapp_profile():
+    orchestrator = whatsappOrchestrator(registry=AgentRegistry())
+    whatsapp_calls = get_llm("whatsapp").stats()["calls"]
+    exercise_calls = get_llm("exercise").stats()["calls"]
+
+    orchestrator.run_query_with_symptoms("Give me a 20 minute strength workout routine", "joint pain")
+
+    assert orchestrator.llm.profile == "classifier"
+    assert get_llm("whatsapp").stats()["calls"] == whatsapp_calls + 1
+    assert get_llm("exercise").stats()["calls"] == exercise_calls
+
+
+def test_consultation_stops_do_not_cut_common_words():
+    stops = [stop.lower() for stop in GENERATION_PROFILES["consultation"]["stop_sequences"]]
+    assert "doctor" not in stops and "consult" not in stops
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from agents.llm_resilience import CircuitBreaker, LLMTimeoutError, LLMUnavailableError, ResilientLLM
+from agents.orchestrator import Orchestrator
+from agents.registry import AgentRegistry
+
+
+class FailingLLM:
+    def invoke(self, prompt, **kwargs):
+        raise ConnectionError("backend down")
+
+
+class StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def invoke(self, prompt, **kwargs):
+        return "".join(self.chunks)
+
+    def stream(self, prompt, **kwargs):
+        yield from self.chunks
+
+
+def _open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.1)
+    with pytest.raises(ConnectionError):
+        ResilientLLM(FailingLLM(), "basic", retries=0, hedge=False, breaker=breaker).invoke("x")
+    assert breaker.state == "open"
+    time.sleep(0.15)
+    return breaker
+
+
+def test_stream_closed_early_resolves_half_open_probe():
+    breaker = _open_breaker()
+    llm = ResilientLLM(StreamingLLM(["a", "b", "c"]), "basic", retries=0, hedge=False, breaker=breaker)
+
+    stream = llm.stream("x")
+    assert next(stream) == "a"
+    stream.close()
+
+    assert breaker.state == "closed"
+    assert llm.invoke("x") == "abc"
+
+
+def test_stream_failure_reopens_breaker():
+    class BrokenStream(StreamingLLM):
+        def stream(self, prompt, **kwargs):
+            yield "a"
+            raise ConnectionError("dropped")
+
+    breaker = _open_breaker()
+    llm = ResilientLLM(BrokenStream(["a"]), "basic", retries=0, hedge=False, breaker=breaker)
+
+    with pytest.raises(ConnectionError):
+        list(llm.stream("x"))
+
+    assert breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        llm.invoke("x")
+
+
+def test_stream_times_out_before_first_chunk():
+    class HangingStream(StreamingLLM):
+        def stream(self, prompt, **kwargs):
+            time.sleep(1.0)
+            yield "late"
+
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    llm = ResilientLLM(HangingStream([]), "basic", deadline=0.1, retries=0, hedge=False, breaker=breaker)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        list(llm.stream("x"))
+
+    assert time.monotonic() - started < 0.5
+    assert llm.stats()["timeouts"] == 1
+    assert breaker.stats()["consecutive_failures"] == 1
+
+
+class StallingStream(StreamingLLM):
+    def stream(self, prompt, **kwargs):
+        yield "Partial "
+        time.sleep(1.0)
+        yield "answer"
+
+
+def test_stream_times_out_after_output_started():
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    llm = ResilientLLM(StallingStream(["Hot flashes"]), "basic", deadline=0.2, retries=0, hedge=False,
+                       breaker=breaker)
+
+    received = []
+    with pytest.raises(LLMTimeoutError):
+        for chunk in llm.stream("x"):
+            received.append(chunk)
+
+    assert received == ["Partial "]
+    assert breaker.stats()["consecutive_failures"] == 1
+
+
+def test_cut_off_stream_is_reported_and_not_saved():
+    llm = ResilientLLM(StallingStream(["Hot flashes"]), "basic", deadline=0.2, retries=0, hedge=False,
+                       breaker=CircuitBreaker())
+    orchestrator = Orchestrator(registry=AgentRegistry(llm=llm))
+
+    events = list(orchestrator.stream_categorization_pipeline("What is menopause?", "stream-cut"))
+
+    assert events[-1][0] == "error"
+    assert "done" not in [event for event, _ in events]
+    assert not orchestrator.conversation_history.has_history("stream-cut")
@@ -0,0 +1,64 @@
+import os
+
+from agents.profile_store import ProfileStore
+from agents.prompt_context import PromptContextCache
+
+USERS = 'user_id,name,dob\nuser_001,Sarah,1978-03-15\nuser_002,Maria,1982-08-22\n'
+LOGS = (
+    'user_id,Hot Flash,Fatigue,period,mood\n'
+    'user_001,"[2024-05-02,2024-05-15]","[2024-05-06]",,\n'
+    'user_002,,"[2024-05-13]",,\n'
+)
+
+
+def make_store(tmp_path):
+    (tmp_path / "users.csv").write_text(USERS)
+    (tmp_path / "logs.csv").write_text(LOGS)
+    return ProfileStore(
+        str(tmp_path / "users.csv"), str(tmp_path / "logs.csv"), reload_interval=0,
+        log_cache_path=None, log_journal_path=str(tmp_path / "entries.csv"),
+    )
+
+
+def test_logging_symptoms_refreshes_only_that_user(tmp_path):
+    store = make_store(tmp_path)
+    before = {user: store.version(user) for user in ("user_001", "user_002")}
+
+    store.log_symptoms("user_001", [("Hot Flash", "2024-05-20", 1), ("Insomnia", "2024-05-20", 1)])
+
+    assert "Logged 'Hot Flash' 3 times" in store.get_log_summary("user_001")
+    assert "Insomnia" in store.get_log_summary("user_001")
+    assert store.version("user_001") != before["user_001"]
+    assert store.version("user_002") == before["user_002"]
+
+
+def test_prompt_context_is_invalidated_per_user(tmp_path):
+    store = make_store(tmp_path)
+    cache = PromptContextCache(store)
+    for user in ("user_001", "user_002"):
+        cache.profile_text(user, store.get_user_data(user)[0], "repr")
+
+    store.log_symptoms("user_002", [("Fatigue", "2024-05-20", 1)])
+    for user in ("user_001", "user_002"):
+        cache.profile_text(user, store.get_user_data(user)[0], "repr")
+
+    assert cache.hits == 1 and cache.misses == 3
+
+
+def test_logged_entries_survive_a_csv_reload_and_reach_other_workers(tmp_path):
+    store = make_store(tmp_path)
+    other = ProfileStore(
+        str(tmp_path / "users.csv"), str(tmp_path / "logs.csv"), reload_interval=0,
+        log_cache_path=None, log_journal_path=str(tmp_path / "entries.csv"),
+    )
+    store.log_symptoms("user_002", [("Hot Flash", "2024-05-20", 1)])
+    assert "Hot Flash" in other.get_log_summary("user_002")
+
+    logs = tmp_path / "logs.csv"
+    logs.write_text(LOGS + 'user_003,"[2024-05-01]",,,\n')
+    stat = os.stat(logs)
+    os.utime(logs, (stat.st_atime, stat.st_mtime + 10))
+
+    assert store.get_log_summary("user_003") is not None
+    assert "Hot Flash" in store.get_log_summary("user_002")
+    assert store.get_user_data("user_002")[1]["Hot Flash"] == ["2024-05-20"]
@@ -0,0 +1,52 @@
+from agents.prompt_budget import PromptSection, assemble_prompt, count_tokens, truncate_to_tokens
+
+TEMPLATE = "Instructions: answer kindly.\nHistory:\n{history}\nDocuments:\n{context}\nQuestion: {question}\n"
+
+
+def _lines(prefix, count):
+    return "\n".join(f"{prefix} line {n} with some filler words to take up tokens" for n in range(count))
+
+
+def test_truncate_keeps_head_or_tail_lines():
+    text = "\n".join(f"line {n}" for n in range(50))
+
+    head = truncate_to_tokens(text, 20, keep="head")
+    tail = truncate_to_tokens(text, 20, keep="tail")
+
+    assert count_tokens(head) <= 20 and text.startswith(head)
+    assert count_tokens(tail) <= 20 and text.endswith(tail)
+    assert truncate_to_tokens("short", 20) == "short"
+    assert truncate_to_tokens("anything", 0) == ""
+
+
+def test_single_long_line_is_cut_by_characters():
+    line = "word " * 200
+
+    cut = truncate_to_tokens(line, 10)
+
+    assert 0 < count_tokens(cut) <= 10 and line.startswith(cut)
+
+
+def test_prompt_that_fits_is_untouched():
+    sections = [PromptSection("history", "User: hi", 1, keep="tail"),
+                PromptSection("context", "Menopause is...", 2)]
+
+    prompt, report = assemble_prompt(TEMPLATE, 500, sections, "test", question="What is menopause?")
+
+    assert prompt == TEMPLATE.format(history="User: hi", context="Menopause is...", question="What is menopause?")
+    assert report["trimmed"] == {}
+
+
+def test_lower_priority_sections_are_trimmed_first():
+    history = _lines("history", 40)
+    context = _lines("document", 5)
+    question = "Which foods help with hot flashes?"
+    sections = [PromptSection("history", history, 1, keep="tail"), PromptSection("context", context, 2)]
+
+    prompt, report = assemble_prompt(TEMPLATE, 200, sections, "test", question=question)
+
+    assert report["prompt_tokens"] <= 200
+    assert set(report["trimmed"]) == {"history"}
+    assert context in prompt and question in prompt
+    # Oldest history goes first
+    assert "history line 39" in prompt and "history line 0 " not in prompt
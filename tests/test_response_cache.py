@@ -0,0 +1,83 @@
+from agents.orchestrator import Orchestrator
+from agents.registry import AgentRegistry
+from agents.response_cache import ResponseCache, normalize_query, prompt_fingerprint
+
+
+class CountingAgent:
+    prompt_template = "Answer: {query}"
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        self.llm = None
+
+    def run(self, query, llm=None):
+        self.calls += 1
+        return self.result
+
+
+def _orchestrator_with(agent):
+    orchestrator = Orchestrator(registry=AgentRegistry())
+    orchestrator.registry.agents["BASIC_QUERY"] = agent
+    return orchestrator
+
+
+def test_normalize_query_folds_case_punctuation_and_spacing():
+    assert normalize_query("  What IS   menopause?! ") == "what is menopause"
+    assert normalize_query("what is menopause") == normalize_query("What is menopause?")
+
+
+def test_ttl_expiry_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("agents.response_cache.time.time", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, persist_path=None)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")  # "b" is the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    now[0] += 61
+    assert cache.get("c") is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_entries_survive_a_restart_through_the_persist_file(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(persist_path=path, persist_every=1)
+    cache.set(cache.make_key("BASIC_QUERY", "What is menopause?", "f1"), "An answer")
+
+    reloaded = ResponseCache(persist_path=path)
+
+    assert reloaded.get(reloaded.make_key("BASIC_QUERY", "what is menopause", "f1")) == "An answer"
+
+
+def test_fingerprint_changes_with_prompt_and_params():
+    agent = CountingAgent("ok")
+    before = prompt_fingerprint(agent)
+    agent.prompt_template = "Answer briefly: {query}"
+
+    assert prompt_fingerprint(agent) != before
+    assert prompt_fingerprint(agent) == prompt_fingerprint(agent)
+
+
+def test_repeated_unpersonalized_query_is_served_from_cache():
+    agent = CountingAgent({"output": "Menopause is..."})
+    orchestrator = _orchestrator_with(agent)
+
+    first = orchestrator.run_unpersonalized("BASIC_QUERY", "What is menopause?")
+    second = orchestrator.run_unpersonalized("BASIC_QUERY", "what is MENOPAUSE")
+
+    assert first == second == "Menopause is..."
+    assert agent.calls == 1
+
+
+def test_degraded_answers_are_not_cached():
+    agent = CountingAgent({"output": "Sorry, try again later.", "error": True})
+    orchestrator = _orchestrator_with(agent)
+
+    orchestrator.run_unpersonalized("BASIC_QUERY", "What is menopause?")
+    orchestrator.run_unpersonalized("BASIC_QUERY", "What is menopause?")
+
+    assert agent.calls == 2
@@ -0,0 +1,50 @@
+from agents.fakes import HashEmbeddings
+from agents.semantic_cache import SemanticCache
+
+
+def _cache(**kwargs):
+    return SemanticCache(HashEmbeddings().embed_query, **kwargs)
+
+
+def test_paraphrase_above_threshold_hits():
+    cache = _cache(threshold=0.8)
+    cache.store("What is menopause?", "Menopause is...", generation_seconds=2.0)
+
+    answer, similarity, _ = cache.lookup("What exactly is menopause?")
+
+    assert answer == "Menopause is..."
+    assert similarity >= 0.8
+    assert cache.stats()["latency_saved_seconds"] == 2.0
+
+
+def test_unrelated_question_misses_and_returns_its_vector():
+    cache = _cache(threshold=0.8)
+    cache.store("What is menopause?", "Menopause is...", generation_seconds=2.0)
+
+    answer, _, vector = cache.lookup("How do I sleep better at night?")
+
+    assert answer is None
+    cache.store("How do I sleep better at night?", "Sleep tips", 1.0, vector=vector)
+    assert cache.lookup("how do I sleep better at night")[0] == "Sleep tips"
+
+
+def test_fingerprint_change_drops_earlier_answers():
+    cache = _cache(threshold=0.8)
+    cache.store("What is menopause?", "Old answer", 1.0, fingerprint="v1")
+    assert cache.lookup("What is menopause?", fingerprint="v1")[0] == "Old answer"
+
+    assert cache.lookup("What is menopause?", fingerprint="v2")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_slot_is_reused_when_full():
+    cache = _cache(threshold=0.99, max_entries=2)
+    cache.store("What is menopause?", "A", 1.0)
+    cache.store("What helps hot flashes?", "B", 1.0)
+    cache.lookup("What is menopause?")
+    cache.store("Which exercises help joint pain?", "C", 1.0)
+
+    assert cache.lookup("What helps hot flashes?")[0] is None
+    assert cache.lookup("What is menopause?")[0] == "A"
+    assert cache.lookup("Which exercises help joint pain?")[0] == "C"
+    assert cache.stats()["evictions"] == 1
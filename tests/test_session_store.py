@@ -0,0 +1,72 @@
+from agents.session_store import MemoryBackend, SessionStore, SqliteBackend
+
+
+class FailingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+
+    def put_many(self, items):
+        if self.fail:
+            raise OSError("disk full")
+        super().put_many(items)
+
+
+def test_writes_are_visible_before_and_after_flush(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "sessions.db"))
+    store = SessionStore(backend, flush_interval=60)
+    store.put("history", "u1", {"messages": ["hi"]})
+
+    assert backend.get("history", "u1") is None
+    assert store.get("history", "u1") == {"messages": ["hi"]}
+
+    store.flush()
+    assert backend.get("history", "u1") == {"messages": ["hi"]}
+    assert SessionStore(SqliteBackend(backend.path)).get("history", "u1") == {"messages": ["hi"]}
+
+    store.delete("history", "u1")
+    store.flush()
+    assert backend.get("history", "u1") is None
+    assert store.get("history", "u1", default="gone") == "gone"
+
+
+def test_returned_values_are_copies():
+    store = SessionStore(MemoryBackend(), flush_interval=60)
+    store.put("state", "u1", {"step": 1})
+
+    value = store.get("state", "u1")
+    value["step"] = 2
+
+    assert store.get("state", "u1") == {"step": 1}
+
+
+def test_cache_ttl_bounds_staleness_of_other_writers():
+    backend = MemoryBackend()
+    cached = SessionStore(backend, cache_ttl=60, flush_interval=60)
+    uncached = SessionStore(backend, cache_ttl=0, flush_interval=60)
+    backend.put_many([(("state", "u1"), {"step": 1})])
+    assert cached.get("state", "u1") == {"step": 1}
+    assert uncached.get("state", "u1") == {"step": 1}
+
+    # Another worker writes straight to the shared backend
+    backend.put_many([(("state", "u1"), {"step": 2})])
+
+    assert cached.get("state", "u1") == {"step": 1}
+    assert uncached.get("state", "u1") == {"step": 2}
+
+
+def test_failed_flush_is_retried_without_losing_newer_writes():
+    backend = FailingBackend()
+    store = SessionStore(backend, flush_interval=60)
+    store.put("state", "u1", {"step": 1})
+    store.put("state", "u2", {"step": 1})
+
+    store.flush()
+    assert store.stats()["flush_errors"] == 1
+    store.put("state", "u1", {"step": 2})
+    backend.fail = False
+    store.flush()
+
+    assert backend.get("state", "u1") == {"step": 2}
+    assert backend.get("state", "u2") == {"step": 1}
+    assert store.stats()["pending"] == 0
@@ -0,0 +1,41 @@
+import pytest
+
+from agents.orchestrator import Orchestrator, StreamingCleaner
+
+SAMPLES = [
+    "Hot flashes are common.\n\n\nTry layered clothing.",
+    "  Sleep matters. User: what else? Assistant: Keep the room cool.",
+    "Calcium helps bones. Question: and vitamin D? Answer: It helps absorption.",
+    "Calcium helps bones.\nQuestion: what about vitamin D and sunlight",
+    "Walking is good. User: can I run too",
+    "Yoga helps balance.\nASSISTANT: Yoga helps balance.",
+    "Eat more fiber. User previously asked: about diet",
+    "Sleep well.\n  User: and naps?\nAssistant: Short ones.",
+    "A common question: is HRT safe? Ask your doctor.\nEach user: keep a symptom diary.",
+    "Good question: yes.\nQuestion: what else",
+]
+
+
+def stream_clean(text, size):
+    cleaner = StreamingCleaner()
+    parts = []
+    for start in range(0, len(text), size):
+        parts.append(cleaner.feed(text[start:start + size]))
+        if cleaner.stopped:
+            break
+    parts.append(cleaner.finish())
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_streamed_tokens_match_done_text(text, size):
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    assert stream_clean(text, size) == orchestrator.clean_response(text)
+
+
+def test_inline_question_is_kept():
+    text = "A common question: is HRT safe? It depends on your history."
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    assert orchestrator.clean_response(text) == text
+    assert stream_clean(text, 3) == text
@@ -0,0 +1,35 @@
+import threading
+import time
+
+from agents import vector_index
+
+
+def test_concurrent_workers_build_an_index_once(tmp_path, monkeypatch):
+    builds = []
+
+    def slow_build(collection_name, urls, embeddings, embedding_model_id, chunk_size, chunk_overlap,
+                   index_dir, force=False):
+        builds.append(index_dir)
+        time.sleep(0.2)
+        manifest = vector_index.build_manifest(collection_name, urls, chunk_size, chunk_overlap, embedding_model_id)
+        vector_index.write_manifest(index_dir, manifest)
+        return "built", {}
+
+    monkeypatch.setattr(vector_index, "_sync_index_locked", slow_build)
+    monkeypatch.setattr(vector_index, "_open_collection", lambda name, embeddings, index_dir: "opened")
+
+    results = []
+
+    def worker():
+        results.append(vector_index.load_or_build_index(
+            "diet", ["https://example.org/a"], None, "hash", index_root=str(tmp_path)
+        ))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert sorted(results) == ["built", "opened", "opened"]
@@ -0,0 +1,72 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class MessageDeduplicator:
+    """
+    Bounded TTL store of webhook results keyed on Twilio's MessageSid.
+    The first delivery of a MessageSid owns the work; retries that arrive while it
+    is in flight wait for its result, and retries after it finished get the stored
+    TwiML back without running the pipeline again. When the owner gives up (discard),
+    a waiting retry is woken and may claim the MessageSid itself.
+    """
+
+    def __init__(self, ttl_seconds=3600, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sid -> {"done": Event, "result": str|None, "discarded": bool, "expires_at": float}
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def begin(self, message_sid):
+        """Return (entry, is_new). Only the caller that gets is_new=True should process the message."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(message_sid)
+            if entry is not None:
+                self.duplicates += 1
+                return entry, False
+            entry = {"done": threading.Event(), "result": None, "discarded": False,
+                     "expires_at": now + self.ttl_seconds}
+            self._entries[message_sid] = entry
+            return entry, True
+
+    def complete(self, message_sid, result):
+        """Store the TwiML for message_sid and release any waiting retries."""
+        with self._lock:
+            entry = self._entries.get(message_sid)
+        if entry is not None:
+            entry["result"] = result
+            entry["done"].set()
+
+    def discard(self, message_sid):
+        """Forget a message whose processing failed so a retry can try again."""
+        with self._lock:
+            entry = self._entries.pop(message_sid, None)
+        if entry is not None:
+            # Waiting retries wake up with no result and call begin() again to take over
+            entry["discarded"] = True
+            entry["done"].set()
+
+    def wait(self, entry, timeout):
+        """Wait for an in-flight original; returns its TwiML or None on timeout/failure."""
+        entry["done"].wait(timeout)
+        return entry["result"]
+
+    def discarded(self, entry):
+        """True once the owner of entry gave up, so a retry should process the message itself."""
+        return entry["discarded"]
+
+    def _evict(self, now):
+        # Entries are in insertion order, so expired ones are at the front
+        while self._entries:
+            sid, entry = next(iter(self._entries.items()))
+            if entry["expires_at"] > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"tracked": len(self._entries), "duplicates": self.duplicates}
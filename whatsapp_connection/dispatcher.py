@@ -0,0 +1,83 @@
+import time
+import zlib
+import queue
+import threading
+
+
+class OrderedDispatcher:
+    """
+    Bounded background worker pool for webhook jobs.
+    Every key (a WhatsApp number) is pinned to one worker thread with its own FIFO
+    queue, so jobs for the same number run strictly in arrival order while different
+    numbers are processed in parallel. Total queued jobs are capped at `capacity`.
+    """
+
+    def __init__(self, workers=4, capacity=200):
+        self.workers = max(1, workers)
+        per_worker = max(1, -(-capacity // self.workers))  # ceil division
+        self._queues = [queue.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+        for index, jobs in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._work, args=(jobs,), name=f"whatsapp-worker-{index}", daemon=True
+            )
+            thread.start()
+
+    def _shard(self, key):
+        # crc32 is stable across processes, unlike hash() on str
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def submit(self, key, fn, *args):
+        """Queue fn(*args) behind earlier jobs for key. Returns False when the queue is full."""
+        try:
+            self._queues[self._shard(key or "")].put_nowait((fn, args))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _work(self, jobs):
+        while True:
+            fn, args = jobs.get()
+            try:
+                fn(*args)
+                with self._lock:
+                    self.completed += 1
+            except Exception as e:
+                print(f"WhatsApp worker job failed: {e}")
+                with self._lock:
+                    self.failed += 1
+            finally:
+                jobs.task_done()
+
+    def join(self, timeout=None):
+        """Wait until every submitted job has finished; returns False if timeout ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for jobs in self._queues:
+            with jobs.all_tasks_done:
+                while jobs.unfinished_tasks:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    jobs.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": sum(jobs.qsize() for jobs in self._queues),
+                "pending": self.submitted - self.completed - self.failed,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
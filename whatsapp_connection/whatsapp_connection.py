@@ -5,56 +5,65 @@ from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client
 from flask import request
 from whatsapp_connection.whatsapp_orchestrator import whatsappOrchestrator
-from langchain_ibm import WatsonxLLM
-from ibm_watson_machine_learning.metanames import GenTextParamsMetaNames as GenParams
+from whatsapp_connection.dispatcher import OrderedDispatcher
+from whatsapp_connection.dedup import MessageDeduplicator
 
 # Load environment variables
 load_dotenv()
 
+# Background delivery settings for the webhook
+WHATSAPP_ASYNC = os.getenv('WHATSAPP_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+WHATSAPP_WORKERS = int(os.getenv('WHATSAPP_WORKERS', '4'))
+WHATSAPP_QUEUE_SIZE = int(os.getenv('WHATSAPP_QUEUE_SIZE', '200'))
+
+# Twilio retry handling: how long a MessageSid is remembered, and how long a retry
+# waits for the in-flight original (kept below Twilio's 15s webhook timeout)
+WHATSAPP_DEDUP_TTL = float(os.getenv('WHATSAPP_DEDUP_TTL', '3600'))
+WHATSAPP_DEDUP_WAIT = float(os.getenv('WHATSAPP_DEDUP_WAIT', '10'))
+
+# twilio | fake: the fake client (agents/fakes.py) records messages instead of sending them
+TWILIO_BACKEND = os.getenv('TWILIO_BACKEND', 'twilio')
+
 class WhatsAppBot:
-    def __init__(self):
-        """Initialize WhatsApp bot with Twilio credentials and orchestrator"""
+    # Session store namespaces
+    SESSION_NAMESPACE = "whatsapp:session"
+    PROFILE_NAMESPACE = "whatsapp:profile"
+
+    def __init__(self, registry=None):
+        """
+        Initialize WhatsApp bot with Twilio credentials and orchestrator.
+        Pass the app's AgentRegistry so both channels share one set of agents.
+        """
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.whatsapp_number = os.getenv('TWILIO_WHATSAPP_NUMBER')
         
-        # Initialize LLM for WhatsApp orchestrator
-        url = os.getenv("URL")
-        apikey = os.getenv("API_KEY")
-        project_id = os.getenv("PROJECT_ID")
-        llm = WatsonxLLM(
-            model_id="ibm/granite-3-8b-instruct",
-            url=url,
-            apikey=apikey,
-            project_id=project_id,
-            params={
-                GenParams.DECODING_METHOD: "greedy",
-                GenParams.TEMPERATURE: 0.1,
-                GenParams.MIN_NEW_TOKENS: 10,
-                GenParams.MAX_NEW_TOKENS: 200,
-                GenParams.STOP_SEQUENCES: [
-                    "Question:", 
-                    "Human:", 
-                    "Observation",
-                    "USER QUESTION:",
-                    "ASSISTANT:",
-                    "User:"
-                ],
-            },
-        )
-        
-        # Initialize WhatsApp orchestrator
-        self.orchestrator = whatsappOrchestrator(llm)
+        # Initialize WhatsApp orchestrator (its LLM comes from the shared client factory)
+        self.orchestrator = whatsappOrchestrator(registry=registry)
         
         # Initialize Twilio client
-        if self.account_sid and self.auth_token:
+        if TWILIO_BACKEND == 'fake':
+            from agents.fakes import FakeTwilioClient
+            self.client = FakeTwilioClient()
+            self.whatsapp_number = self.whatsapp_number or '+10000000000'
+        elif self.account_sid and self.auth_token:
             self.client = Client(self.account_sid, self.auth_token)
         else:
             print("Warning: Twilio credentials not found in environment variables")
             self.client = None
         
-        # User session storage (in production, use a database)
-        self.user_sessions = {}
+        # Replies can only be delivered asynchronously through the Twilio API
+        if WHATSAPP_ASYNC and self.client:
+            self.dispatcher = OrderedDispatcher(workers=WHATSAPP_WORKERS, capacity=WHATSAPP_QUEUE_SIZE)
+        else:
+            self.dispatcher = None
+        
+        # Webhook results keyed on MessageSid so Twilio retries are idempotent
+        self.deduplicator = MessageDeduplicator(ttl_seconds=WHATSAPP_DEDUP_TTL)
+        
+        # Conversation state and registered profiles live in the shared session store,
+        # so they survive restarts and are visible to every worker process
+        self.session_store = self.orchestrator.registry.session_store
         
         # Conversation states
         self.CONVERSATION_STATES = {
@@ -64,27 +73,101 @@ class WhatsAppBot:
         }
     
     def process_whatsapp_message(self):
-        """Process incoming WhatsApp message and return TwiML response"""
+        """
+        Process incoming WhatsApp message and return TwiML response.
+        When a Twilio client is available the message is queued for a background
+        worker and acknowledged right away with empty TwiML; the answer is delivered
+        later through send_whatsapp_message. Messages from one number are handled in order.
+        Twilio retries of the same MessageSid reuse the original result instead of
+        running the pipeline again, unless the original delivery was dropped.
+        """
         try:
             # Get message details from Twilio webhook
             from_number = request.form.get('From')
             message_body = request.form.get('Body', '').strip()
+            message_sid = request.form.get('MessageSid')
             
             print(f"Received WhatsApp message from {from_number}: {message_body}")
             
-            # Create TwiML response
+            if not message_sid:
+                twiml, _ = self._respond(from_number, message_body)
+                return twiml
+            
+            entry, is_new = self.deduplicator.begin(message_sid)
+            while not is_new:
+                print(f"Duplicate delivery of {message_sid}, reusing the original result")
+                twiml = self.deduplicator.wait(entry, WHATSAPP_DEDUP_WAIT)
+                if twiml is not None:
+                    return twiml
+                if not self.deduplicator.discarded(entry):
+                    # The original is still in flight and will answer
+                    return str(MessagingResponse())
+                # The original was dropped (queue full or an error); this retry takes over
+                print(f"Original delivery of {message_sid} was dropped, processing the retry")
+                entry, is_new = self.deduplicator.begin(message_sid)
+            
+            try:
+                twiml, final = self._respond(from_number, message_body)
+            except Exception:
+                self.deduplicator.discard(message_sid)
+                raise
+            if final:
+                self.deduplicator.complete(message_sid, twiml)
+            else:
+                self.deduplicator.discard(message_sid)
+            return twiml
+            
+        except Exception as e:
+            print(f"Error in process_whatsapp_message: {str(e)}")
             resp = MessagingResponse()
+            resp.message("I'm sorry, something went wrong. Please try again later.")
+            return str(resp)
+    
+    def _respond(self, from_number, message_body):
+        """
+        Answer inline or hand the message to the background dispatcher.
+        Returns (twiml, final); final is False when the message was not accepted
+        and a retry of it should be processed again.
+        """
+        if self.dispatcher is None:
+            return self._to_twiml(self.handle_message(from_number, message_body)), True
+        
+        if not self.dispatcher.submit(from_number, self._deliver_replies, from_number, message_body):
+            print(f"WhatsApp queue full, rejecting message from {from_number}")
+            return self._to_twiml([
+                "I'm receiving a lot of messages right now. Please send your question again in a minute."
+            ]), False
+        
+        # Acknowledge immediately; the reply is sent when the worker finishes
+        return str(MessagingResponse()), True
+    
+    def _to_twiml(self, replies):
+        resp = MessagingResponse()
+        for reply in replies:
+            resp.message(reply)
+        return str(resp)
+    
+    def _deliver_replies(self, from_number, message_body):
+        """Background job: run the conversation flow and send the replies via the Twilio API"""
+        to_number = from_number.replace('whatsapp:', '')
+        for reply in self.handle_message(from_number, message_body):
+            self.send_whatsapp_message(to_number, reply)
+    
+    def handle_message(self, from_number, message_body):
+        """Run the conversation flow for one incoming message and return the reply texts"""
+        try:
+            replies = []
             
             # Handle empty messages
             if not message_body:
-                resp.message("Hi! I'm Bloom, your menopause health assistant. Please send me your question about menopause, diet, exercise, or health consultation.")
-                return str(resp)
+                replies.append("Hi! I'm Bloom, your menopause health assistant. Please send me your question about menopause, diet, exercise, or health consultation.")
+                return replies
             
             # Check for special commands
             if message_body.lower() in ['hi', 'hello', 'start', 'help']:
                 welcome_message = self._get_welcome_message()
-                resp.message(welcome_message)
-                return str(resp)
+                replies.append(welcome_message)
+                return replies
             
             # Get user session to track conversation state
             user_session = self._get_user_session(from_number)
@@ -108,11 +191,11 @@ class WhatsAppBot:
                     result = self.orchestrator.run_query_with_symptoms(original_query, symptoms, user_id)
                     response_text = str(result)
                     response_text = self._truncate_message(response_text)
-                    resp.message(response_text)
+                    replies.append(response_text)
                 except Exception as e:
                     print(f"Error processing query with symptoms: {str(e)}")
                     error_message = "I'm sorry, I encountered an error processing your request. Please try again or contact support."
-                    resp.message(error_message)
+                    replies.append(error_message)
                 
                 # Reset session state but keep symptoms
                 self._update_user_session(from_number, {
@@ -122,7 +205,7 @@ class WhatsAppBot:
                     # Keep symptoms in session for future use
                 })
                 
-                return str(resp)
+                return replies
             
             # Check if this is a basic query that doesn't need symptoms
             if self._is_basic_query(message_body):
@@ -131,13 +214,13 @@ class WhatsAppBot:
                     result = self.orchestrator.run_basic_query_without_user(message_body)
                     response_text = str(result)
                     response_text = self._truncate_message(response_text)
-                    resp.message(response_text)
+                    replies.append(response_text)
                 except Exception as e:
                     print(f"Error processing basic query: {str(e)}")
                     error_message = "I'm sorry, I encountered an error processing your request. Please try again or contact support."
-                    resp.message(error_message)
+                    replies.append(error_message)
                 
-                return str(resp)
+                return replies
             
             # For all other queries (consultation, diet, exercise), check if we have symptoms
             if user_session['has_provided_symptoms'] and user_session['symptoms']:
@@ -146,13 +229,13 @@ class WhatsAppBot:
                     result = self.orchestrator.run_query_with_symptoms(message_body, user_session['symptoms'], user_id)
                     response_text = str(result)
                     response_text = self._truncate_message(response_text)
-                    resp.message(response_text)
+                    replies.append(response_text)
                 except Exception as e:
                     print(f"Error processing query with saved symptoms: {str(e)}")
                     error_message = "I'm sorry, I encountered an error processing your request. Please try again or contact support."
-                    resp.message(error_message)
+                    replies.append(error_message)
                 
-                return str(resp)
+                return replies
             
             # Check if user wants to update their symptoms
             if message_body.lower() in ['update symptoms', 'change symptoms', 'new symptoms']:
@@ -164,8 +247,8 @@ class WhatsAppBot:
                 })
                 
                 symptom_request = self._ask_for_symptoms()
-                resp.message(symptom_request)
-                return str(resp)
+                replies.append(symptom_request)
+                return replies
             
             # For all other queries, ask for symptoms first (only if not provided before)
             self._update_user_session(from_number, {
@@ -174,15 +257,13 @@ class WhatsAppBot:
             })
             
             symptom_request = self._ask_for_symptoms()
-            resp.message(symptom_request)
+            replies.append(symptom_request)
             
-            return str(resp)
+            return replies
             
         except Exception as e:
-            print(f"Error in process_whatsapp_message: {str(e)}")
-            resp = MessagingResponse()
-            resp.message("I'm sorry, something went wrong. Please try again later.")
-            return str(resp)
+            print(f"Error in handle_message: {str(e)}")
+            return ["I'm sorry, something went wrong. Please try again later."]
     
     def send_whatsapp_message(self, to_number, message):
         """Send a WhatsApp message to a specific number"""
@@ -216,33 +297,31 @@ Just send me your question and I'll provide personalized guidance!
 Simply type your question in any of these areas, and I'll provide personalized advice!"""
     
     def _get_user_data(self, phone_number):
-        """Retrieve user data for personalization (placeholder for database integration)"""
-        # In a real implementation, this would query a database
-        # For now, return None or sample data
-        return self.user_sessions.get(phone_number, None)
+        """Retrieve the registered profile for personalization"""
+        return self.session_store.get(self.PROFILE_NAMESPACE, phone_number)
     
     def _save_user_data(self, phone_number, user_data):
-        """Save user data for future sessions (placeholder for database integration)"""
-        # In a real implementation, this would save to a database
-        self.user_sessions[phone_number] = user_data
+        """Save the user's profile for future sessions"""
+        self.session_store.put(self.PROFILE_NAMESPACE, phone_number, user_data)
     
     def _get_user_session(self, phone_number):
         """Get user session data"""
-        if phone_number not in self.user_sessions:
-            self.user_sessions[phone_number] = {
+        session = self.session_store.get(self.SESSION_NAMESPACE, phone_number)
+        if session is None:
+            session = {
                 'state': self.CONVERSATION_STATES['INITIAL'],
                 'pending_query': None,
                 'symptoms': None,
                 'profile': None,
                 'has_provided_symptoms': False  # Track if user has provided symptoms
             }
-        return self.user_sessions[phone_number]
+        return session
     
     def _update_user_session(self, phone_number, updates):
         """Update user session data"""
         session = self._get_user_session(phone_number)
         session.update(updates)
-        self.user_sessions[phone_number] = session
+        self.session_store.put(self.SESSION_NAMESPACE, phone_number, session)
     
     def _is_basic_query(self, message):
         """Determine if a query is basic (general menopause information)"""